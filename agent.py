@@ -2,12 +2,16 @@
 Deep Q-Learning Agent for Snake Game
 """
 import torch
-import random
 import numpy as np
 import os
-from collections import deque
-from snake_game import SnakeGameAI, Direction, Point
-from model import Linear_QNet, QTrainer
+import argparse
+from snake_engine import spawn_seeds
+from model import Linear_QNet, QTrainer, QValueCache, quantize_model, quantization_report
+from observation import NUM_STATES, unpack_states
+from replay_memory import ReplayMemory, PrioritizedReplayMemory, MAX_MEMORY, BATCH_SIZE, SHORT_BATCH
+from profiling import PhaseProfiler, add_profiler_arguments, profiler_from_args
+from metrics import MetricsSink, add_metrics_arguments, metrics_from_args
+from checkpoint import CheckpointWriter, cpu_copy, replay_path
 
 # Check CUDA availability and handle cuDNN version issues
 def check_cuda_availability():
@@ -27,22 +31,46 @@ def check_cuda_availability():
 DEVICE = torch.device('cuda' if check_cuda_availability() else 'cpu')
 print(f"Using device: {DEVICE}")
 
-MAX_MEMORY = 100_000
-BATCH_SIZE = 1000
 LR = 0.001
+# Optimizer steps between Q-value cache refreshes (1 = always exact)
+Q_CACHE_REFRESH = 1
 
 class Agent:
     """
     Reinforcement Learning Agent using Deep Q-Learning
     """
     
-    def __init__(self):
+    def __init__(self, prioritized=False, q_cache_refresh=Q_CACHE_REFRESH, short_batch=SHORT_BATCH,
+                 seed=None, max_memory=MAX_MEMORY, batch_size=BATCH_SIZE, lr=LR, gamma=0.9):
         self.n_games = 0
         self.epsilon = 0  # Randomness
-        self.gamma = 0.9  # Discount rate
-        self.memory = deque(maxlen=MAX_MEMORY)  # popleft()
-        self.model = Linear_QNet(11, 256, 3)
-        self.trainer = QTrainer(self.model, lr=LR, gamma=self.gamma)
+        self.gamma = gamma  # Discount rate
+        self.batch_size = batch_size
+        # Prioritized replay samples by TD error instead of uniformly
+        self.prioritized = prioritized
+        # Separate streams for exploration, replay sampling and weight init
+        action_seed, memory_seed, model_seed = spawn_seeds(seed, 3)
+        if prioritized:
+            self.memory = PrioritizedReplayMemory(max_memory, seed=memory_seed)
+        else:
+            self.memory = ReplayMemory(max_memory, seed=memory_seed)  # overwrites oldest when full
+        if seed is None:
+            self.model = Linear_QNet(11, 256, 3)
+        else:
+            # Seeded init without touching torch's global generator
+            with torch.random.fork_rng(devices=[]):
+                torch.manual_seed(model_seed)
+                self.model = Linear_QNet(11, 256, 3)
+        self.trainer = QTrainer(self.model, lr=lr, gamma=self.gamma)
+        self.q_cache = QValueCache(self.model, refresh_every=q_cache_refresh)
+        self.rng = np.random.default_rng(action_seed)
+        # Short-memory transitions waiting for a batched update
+        self.short_batch = short_batch
+        self.short_memory = ReplayMemory(short_batch)
+        # Best score saved by save_model, kept across checkpoints
+        self.record = 0
+        # Writes model files and checkpoints off the training thread
+        self.writer = CheckpointWriter()
         
     def get_state(self, game):
         """Get the current game state"""
@@ -50,21 +78,43 @@ class Agent:
     
     def remember(self, state, action, reward, next_state, done):
         """Store experience in memory"""
-        self.memory.append((state, action, reward, next_state, done))  # popleft if MAX_MEMORY is reached
+        self.memory.append(state, action, reward, next_state, done)
     
     def train_long_memory(self):
         """Train on a batch of experiences from memory"""
-        if len(self.memory) > BATCH_SIZE:
-            mini_sample = random.sample(self.memory, BATCH_SIZE)  # list of tuples
+        if self.prioritized:
+            batch, idx, weights = self.memory.sample_prioritized(self.batch_size)
+            td_errors = self.trainer.train_step(*batch, weights=weights)
+            self.memory.update_priorities(idx, td_errors)
         else:
-            mini_sample = self.memory
-            
-        states, actions, rewards, next_states, dones = zip(*mini_sample)
-        self.trainer.train_step(states, actions, rewards, next_states, dones)
+            # Random batch of batch_size, or everything while memory is smaller
+            states, actions, rewards, next_states, dones = self.memory.sample(self.batch_size)
+            self.trainer.train_step(states, actions, rewards, next_states, dones)
+        self.q_cache.on_update()
     
     def train_short_memory(self, state, action, reward, next_state, done):
-        """Train on a single experience"""
-        self.trainer.train_step(state, action, reward, next_state, done)
+        """
+        Train on a single experience
+        
+        With short_batch=K > 1 the experience is queued instead, and the
+        last K experiences are trained on together in one optimizer step
+        (sooner when a game ends).
+        """
+        if self.short_batch == 1:
+            self.trainer.train_step(state, action, reward, next_state, done)
+            self.q_cache.on_update()
+            return
+        self.short_memory.append(state, action, reward, next_state, done)
+        if done or len(self.short_memory) == self.short_batch:
+            self.flush_short_memory()
+    
+    def flush_short_memory(self):
+        """Train on the queued short-memory experiences, if any"""
+        if len(self.short_memory) == 0:
+            return
+        self.trainer.train_step(*self.short_memory.batch(np.arange(len(self.short_memory))))
+        self.q_cache.on_update()
+        self.short_memory.clear()
     
     def get_action(self, state):
         """
@@ -74,74 +124,212 @@ class Agent:
         # Random moves: tradeoff exploration / exploitation
         self.epsilon = 80 - self.n_games
         final_move = [0, 0, 0]
-        if random.randint(0, 200) < self.epsilon:
-            move = random.randint(0, 2)
+        if self.rng.integers(0, 201) < self.epsilon:
+            move = int(self.rng.integers(0, 3))
             final_move[move] = 1
         else:
-            state0 = torch.tensor(state, dtype=torch.float).to(DEVICE)
-            prediction = self.model(state0)
-            move = torch.argmax(prediction).item()
+            move = self.q_cache.greedy_action(state)
             final_move[move] = 1
             
         return final_move
     
-    def save_model(self, filename='model.pth'):
-        """Save the current model"""
-        self.model.save(filename)
+    def get_action_batch(self, states, one_hot=True):
+        """
+        Epsilon-greedy actions for many games at once
+        Args:
+            states: (n, 11) states
+            one_hot: return (n, 3) one-hot actions instead of (n,) indices
+        Returns:
+            numpy array of actions
+        """
+        self.epsilon = 80 - self.n_games
+        states = np.asarray(states)
+        moves = self.q_cache.greedy_actions(states)
+        explore = self.rng.integers(0, 201, len(states)) < self.epsilon
+        moves = np.where(explore, self.rng.integers(0, 3, len(states)), moves)
+        if one_hot:
+            return np.eye(3, dtype=np.int8)[moves]
+        return moves
+    
+    def save_model(self, filename='model.pth', wait=False):
+        """
+        Save the current model
         
-    def load_model(self, filename='model.pth'):
-        """Load a saved model"""
+        The weights are copied here and written to ./model by a background
+        thread, replacing the old file atomically. Pass wait=True to block
+        until the file is written.
+        """
+        weights = cpu_copy(self.model.state_dict())
+        self.writer.submit(os.path.join('./model', filename), lambda f: torch.save(weights, f))
+        if wait:
+            self.writer.wait()
+    
+    def save_checkpoint(self, filename='checkpoint.pth', replay=False, wait=False):
+        """
+        Save everything needed to resume training, in the background
+        Args:
+            replay: also save the replay memory, compressed, next to the
+                checkpoint as <name>.replay.npz
+            wait: block until the files are written
+        """
+        state = {
+            'model': cpu_copy(self.model.state_dict()),
+            'optimizer': cpu_copy(self.trainer.optimizer.state_dict()),
+            'n_games': self.n_games,
+            'epsilon': self.epsilon,
+            'record': self.record,
+            'rng': self.rng.bit_generator.state,
+            'memory_rng': self.memory.rng.bit_generator.state,
+        }
+        path = os.path.join('./model', filename)
+        self.writer.submit(path, lambda f: torch.save(state, f))
+        if replay:
+            memory = self.memory.snapshot()
+            self.writer.submit(replay_path(path), lambda f: np.savez_compressed(f, **memory))
+        if wait:
+            self.writer.wait()
+    
+    def load_checkpoint(self, filename='checkpoint.pth', replay=True):
+        """
+        Resume from save_checkpoint: weights, optimizer state, counters,
+        random streams and, if saved and replay is True, the replay memory
+        Returns:
+            False if there is no checkpoint to resume from
+        """
+        path = os.path.join('./model', filename)
+        if not os.path.exists(path):
+            print(f"No checkpoint found at {path}")
+            return False
+        state = torch.load(path, map_location=DEVICE)
+        self.model.load_state_dict(state['model'])
+        self.trainer.optimizer.load_state_dict(state['optimizer'])
+        self.n_games = state['n_games']
+        self.epsilon = state['epsilon']
+        self.record = state['record']
+        self.rng.bit_generator.state = state['rng']
+        self.memory.rng.bit_generator.state = state['memory_rng']
+        self.q_cache.invalidate()
+        message = f"Resumed from {path} at game {self.n_games}"
+        if replay and os.path.exists(replay_path(path)):
+            with np.load(replay_path(path)) as snapshot:
+                self.memory.restore(dict(snapshot))
+            message += f" with {len(self.memory)} replay transitions"
+        print(message)
+        return True
+        
+    def load_model(self, filename='model.pth', int8=False):
+        """
+        Load a saved model
+        Args:
+            int8: act with an int8-quantized copy of the model, calibrated
+                on the states in replay memory (all 2048 states if empty).
+                Inference only: training keeps updating the float model.
+        """
         model_path = f'./model/{filename}'
         if os.path.exists(model_path):
             self.model.load_state_dict(torch.load(model_path, map_location=DEVICE))
+            self.q_cache.invalidate()
             print(f"Model loaded from {model_path}")
+            if int8:
+                self.quantize()
         else:
             print(f"No model found at {model_path}")
+    
+    def quantize(self):
+        """Switch greedy action selection to an int8 copy of the model"""
+        if len(self.memory) > 0:
+            calibration_states = self.memory.states[:len(self.memory)]
+        else:
+            calibration_states = unpack_states(np.arange(NUM_STATES))
+        self.quantized_model = quantize_model(self.model, calibration_states)
+        self.q_cache = QValueCache(self.quantized_model, refresh_every=self.q_cache.refresh_every,
+                                   device=torch.device('cpu'))
+        report = quantization_report(self.model, self.quantized_model)
+        print(f"Int8 policy agrees with float on {report['action_agreement']:.1%} of states "
+              f"(max Q error {report['max_q_error']:.3f})")
+        return report
 
 
-def train():
-    """Training loop for the agent"""
-    plot_scores = []
-    plot_mean_scores = []
-    total_score = 0
-    record = 0
+def train(profiler=None, metrics=None, resume=False, replay=False):
+    """
+    Training loop for the agent
+    Args:
+        profiler: optional PhaseProfiler timing each phase of the loop
+        metrics: optional MetricsSink receiving per-game and per-interval
+            records (rolling stats only by default)
+        resume: continue from ./model/checkpoint.pth if it exists
+        replay: include the replay memory in the checkpoint written on exit
+            (and restore it on resume)
+    """
+    if profiler is None:
+        profiler = PhaseProfiler()
+    if metrics is None:
+        metrics = MetricsSink()
+    # Imported here so headless users of Agent never load pygame
+    from snake_game import SnakeGameAI
     agent = Agent()
+    if resume and agent.load_checkpoint(replay=replay):
+        metrics.record = agent.record
     game = SnakeGameAI()
     
-    while True:
-        # Get old state
-        state_old = agent.get_state(game)
-        
-        # Get move
-        final_move = agent.get_action(state_old)
-        
-        # Perform move and get new state
-        reward, done, score = game.play_step(final_move)
-        state_new = agent.get_state(game)
-        
-        # Train short memory
-        agent.train_short_memory(state_old, final_move, reward, state_new, done)
-        
-        # Remember
-        agent.remember(state_old, final_move, reward, state_new, done)
-        
-        if done:
-            # Train long memory (experience replay), plot result
-            game.reset()
-            agent.n_games += 1
-            agent.train_long_memory()
+    try:
+        while True:
+            # Get old state (cached from the previous step)
+            with profiler.phase('get_state'):
+                state_old = agent.get_state(game)
             
-            if score > record:
-                record = score
-                agent.save_model()
-                
-            print('Game', agent.n_games, 'Score', score, 'Record:', record)
+            # Get move
+            with profiler.phase('get_action'):
+                final_move = agent.get_action(state_old)
             
-            plot_scores.append(score)
-            total_score += score
-            mean_score = total_score / agent.n_games
-            plot_mean_scores.append(mean_score)
+            # Perform move and get new state
+            with profiler.phase('env_step'):
+                state_new, reward, done, info = game.step(final_move)
+            score = info['score']
+            
+            # Train short memory
+            with profiler.phase('train_short'):
+                agent.train_short_memory(state_old, final_move, reward, state_new, done)
+            
+            # Remember
+            with profiler.phase('remember'):
+                agent.remember(state_old, final_move, reward, state_new, done)
+            metrics.add_steps()
+            
+            if done:
+                # Train long memory (experience replay), record result
+                length = game.frame_iteration
+                with profiler.phase('env_reset'):
+                    game.reset()
+                agent.n_games += 1
+                with profiler.phase('train_long'):
+                    agent.train_long_memory()
+                
+                if score > metrics.record:
+                    agent.record = score
+                    with profiler.phase('save_model'):
+                        agent.save_model()
+                metrics.episode(score, length, loss=agent.trainer.last_loss,
+                                epsilon=agent.epsilon, replay_size=len(agent.memory))
+                    
+                print('Game', agent.n_games, 'Score', score, 'Record:', metrics.record,
+                      f'Mean: {metrics.mean_score:.1f}')
+            profiler.step()
+    finally:
+        agent.save_checkpoint(replay=replay, wait=True)
+        profiler.close()
+        metrics.close()
+        if profiler.enabled:
+            profiler.dump()
 
 
 if __name__ == '__main__':
-    train()
+    parser = argparse.ArgumentParser(description='Train the DQN agent with a game window')
+    add_profiler_arguments(parser)
+    add_metrics_arguments(parser)
+    parser.add_argument('--resume', action='store_true',
+                        help='continue from ./model/checkpoint.pth')
+    parser.add_argument('--checkpoint-replay', action='store_true',
+                        help='save and restore the replay memory with the checkpoint')
+    args = parser.parse_args()
+    train(profiler_from_args(args), metrics_from_args(args), args.resume, args.checkpoint_replay)
@@ -0,0 +1,3 @@
+"""
+Hot-path benchmarks, see run.py
+"""
@@ -0,0 +1,271 @@
+"""
+Benchmarks for the env, inference and training hot paths
+
+Every case runs on fixed seeds after a warm-up. Board sizes and snake
+lengths are swept where they change the cost. Results go to a JSON file,
+and a stored baseline can be compared against with a regression threshold.
+
+Usage:
+    python benchmarks/run.py                      # run, write benchmarks/results.json
+    python benchmarks/run.py --save-baseline      # also store as benchmarks/baseline.json
+    python benchmarks/run.py --threshold 0.2      # exit 1 if any case is >20% slower
+"""
+import os
+import sys
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Rendering runs off-screen
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import platform
+import statistics
+import time
+import numpy as np
+import torch
+from agent import Agent
+from model import Linear_QNet, QTrainer
+from observation import NUM_STATES, unpack_states
+from snake_engine import BLOCK_SIZE, CLOCK_WISE, Point
+from snake_game import SnakeGameAI
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(HERE, 'results.json')
+BASELINE_FILE = os.path.join(HERE, 'baseline.json')
+# A case regresses when it is this much slower than the baseline
+THRESHOLD = 0.2
+
+BOARDS = ((200, 200), (640, 480), (1280, 960))
+LENGTHS = (3, 50, 200)
+
+
+def measure(fn, number, repeat=5, warmup=1):
+    """
+    Time fn() in repeat rounds of number calls, after warmup rounds
+    Returns:
+        dict with the median and best microseconds per call
+    """
+    for _ in range(warmup):
+        for _ in range(number):
+            fn()
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number * 1e6)
+    return {'us_per_call': statistics.median(rounds), 'best_us_per_call': min(rounds)}
+
+
+def place_snake(game, length):
+    """
+    Lay a snake of the given length along a serpentine path from the top
+    left corner, head last, and restart the game's frame counter
+    """
+    cells = []
+    for y in range(game.rows):
+        row = range(game.cols) if y % 2 == 0 else range(game.cols - 1, -1, -1)
+        cells.extend((x, y) for x in row)
+    path = cells[:min(length, len(cells) - 1)]
+    game.set_body([Point(x * BLOCK_SIZE, y * BLOCK_SIZE) for x, y in reversed(path)])
+    (hx, hy), (nx, ny) = path[-1], path[-2]
+    game.direction = CLOCK_WISE[((1, 0), (0, 1), (-1, 0), (0, -1)).index((hx - nx, hy - ny))]
+    game._place_food()
+    game.frame_iteration = 0
+    game.score = 0
+    game.won = False
+
+
+def bench_play_step(w, h, length, steps=20000):
+    """Headless SnakeGameAI.play_step with random actions, re-laid on game over"""
+    game = SnakeGameAI(w, h, render=False, seed=0)
+    actions = np.random.default_rng(0).integers(0, 3, steps).tolist()
+
+    def run():
+        elapsed = 0.0
+        i = 0
+        while i < steps:
+            place_snake(game, length)
+            start = time.perf_counter()
+            while i < steps:
+                i += 1
+                if game.play_step(actions[i - 1])[1]:
+                    break
+            elapsed += time.perf_counter() - start
+        return elapsed
+
+    run()  # Warm-up
+    rounds = [run() / steps * 1e6 for _ in range(5)]
+    return {'us_per_call': statistics.median(rounds), 'best_us_per_call': min(rounds)}
+
+
+def bench_get_state(w, h, length):
+    """get_state with the per-frame cache missed and hit"""
+    game = SnakeGameAI(w, h, render=False, seed=0)
+    place_snake(game, length)
+    return {
+        'uncached': measure(game._compute_state, 2000),
+        'cached': measure(game.get_state, 20000),
+    }
+
+
+def bench_is_collision(w, h, length):
+    """is_collision on random on- and off-board points"""
+    game = SnakeGameAI(w, h, render=False, seed=0)
+    place_snake(game, length)
+    rng = np.random.default_rng(0)
+    xs = rng.integers(-1, game.cols + 1, 1000) * BLOCK_SIZE
+    ys = rng.integers(-1, game.rows + 1, 1000) * BLOCK_SIZE
+    points = [Point(int(x), int(y)) for x, y in zip(xs, ys)]
+
+    def run():
+        for pt in points:
+            game.is_collision(pt)
+
+    result = measure(run, 10)
+    return {k: v / len(points) for k, v in result.items()}
+
+
+def random_transitions(n, seed=0):
+    """n random transitions as (states, actions, rewards, next_states, dones)"""
+    rng = np.random.default_rng(seed)
+    states = unpack_states(rng.integers(0, NUM_STATES, n))
+    next_states = unpack_states(rng.integers(0, NUM_STATES, n))
+    actions = np.eye(3, dtype=np.int8)[rng.integers(0, 3, n)]
+    rewards = rng.choice(np.array([-10.0, 0.0, 10.0], dtype=np.float32), n)
+    dones = rng.random(n) < 0.05
+    return states, actions, rewards, next_states, dones
+
+
+def bench_get_action():
+    """Greedy Agent.get_action over random states"""
+    agent = Agent(seed=0)
+    agent.n_games = 1000  # Past the exploration schedule
+    states = list(unpack_states(np.random.default_rng(0).integers(0, NUM_STATES, 1000)))
+
+    def run():
+        for state in states:
+            agent.get_action(state)
+
+    result = measure(run, 5)
+    return {k: v / len(states) for k, v in result.items()}
+
+
+def bench_train_step(batch_size):
+    """One QTrainer.train_step on a batch of random transitions"""
+    torch.manual_seed(0)
+    trainer = QTrainer(Linear_QNet(11, 256, 3), lr=0.001, gamma=0.9)
+    batch = random_transitions(batch_size)
+    number = 200 if batch_size == 1 else 20
+    return measure(lambda: trainer.train_step(*batch), number)
+
+
+def bench_train_long_memory():
+    """Agent.train_long_memory on a replay memory of 10000 transitions"""
+    agent = Agent(seed=0)
+    agent.memory.extend(*random_transitions(10000))
+    return measure(agent.train_long_memory, 20)
+
+
+def bench_update_ui(w, h, length):
+    """SnakeGameAI._update_ui rendering to an off-screen display"""
+    game = SnakeGameAI(w, h, render=True, seed=0)
+    place_snake(game, length)
+    return measure(game._update_ui, 100)
+
+
+def run_all(boards=BOARDS, lengths=LENGTHS):
+    """
+    Run every case
+    Returns:
+        dict of case name -> {'us_per_call', 'best_us_per_call'}
+    """
+    results = {}
+    for w, h in boards:
+        for length in lengths:
+            if length >= (w // BLOCK_SIZE) * (h // BLOCK_SIZE):
+                continue
+            tag = f'{w}x{h}/len{length}'
+            results[f'play_step/{tag}'] = bench_play_step(w, h, length)
+            for kind, result in bench_get_state(w, h, length).items():
+                results[f'get_state_{kind}/{tag}'] = result
+            results[f'is_collision/{tag}'] = bench_is_collision(w, h, length)
+            results[f'update_ui/{tag}'] = bench_update_ui(w, h, length)
+    results['get_action'] = bench_get_action()
+    results['train_step/batch1'] = bench_train_step(1)
+    results['train_step/batch1000'] = bench_train_step(1000)
+    results['train_long_memory'] = bench_train_long_memory()
+    return results
+
+
+def environment():
+    """Versions and machine the results were measured on"""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'torch': torch.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'torch_threads': torch.get_num_threads(),
+    }
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Compare results against a baseline
+    Args:
+        results, baseline: dicts of case name -> {'us_per_call', ...}
+        threshold: allowed slowdown as a fraction of the baseline time
+    Returns:
+        list of (name, baseline us, current us, ratio, regressed) for
+        every case present in both
+    """
+    rows = []
+    for name in sorted(set(results) & set(baseline)):
+        old = baseline[name]['us_per_call']
+        new = results[name]['us_per_call']
+        ratio = new / old if old > 0 else float('inf')
+        rows.append((name, old, new, ratio, ratio > 1 + threshold))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hot-path benchmarks')
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='allowed slowdown against the baseline, as a fraction')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the new baseline')
+    parser.add_argument('--quick', action='store_true',
+                        help='smallest board and shortest snake only')
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)  # Comparable numbers across machines
+    if args.quick:
+        results = run_all(BOARDS[:1], LENGTHS[:1])
+    else:
+        results = run_all()
+    report = {'environment': environment(), 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    for name, result in sorted(results.items()):
+        print(f"{name:<40} {result['us_per_call']:12.2f} us")
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        rows = compare(results, baseline, args.threshold)
+        print()
+        print(f"Against {args.baseline} (threshold +{args.threshold:.0%}):")
+        for name, old, new, ratio, regressed in rows:
+            print(f"{name:<40} {old:10.2f} -> {new:10.2f} us  {ratio:5.2f}x"
+                  + ("  REGRESSION" if regressed else ""))
+        if any(row[4] for row in rows):
+            sys.exit(1)
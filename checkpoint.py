@@ -0,0 +1,104 @@
+"""
+Crash-safe, non-blocking checkpoint writing
+
+Files are written to a temporary name next to the target, fsynced and
+renamed over it, so a crash mid-write leaves the previous file intact.
+CheckpointWriter does the writing on a background thread, so the training
+loop only pays for an in-memory snapshot.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+
+def atomic_write(path, write):
+    """
+    Write a file so readers see either the old or the new contents
+    Args:
+        path: destination file
+        write: callable taking a binary file object and writing to it
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f'{path}.tmp{os.getpid()}'
+    try:
+        with open(tmp, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def replay_path(path):
+    """File holding the compressed replay memory of a checkpoint"""
+    return os.path.splitext(path)[0] + '.replay.npz'
+
+
+def cpu_copy(obj):
+    """Copy of a (nested) state dict with every tensor cloned to the CPU"""
+    import torch  # Only here, so torch-free modules can use atomic_write
+    if torch.is_tensor(obj):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {k: cpu_copy(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(cpu_copy(v) for v in obj)
+    return obj
+
+
+class CheckpointWriter:
+    """
+    Background thread writing files with atomic_write
+
+    A file submitted again before its previous version was written is
+    only written once, with the newest contents. The thread starts on
+    demand and exits when idle; it is not a daemon, so the interpreter
+    finishes pending writes before exiting. A failed write is re-raised
+    by the next submit or wait.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()  # path -> write callable
+        self._thread = None
+        self._error = None
+
+    def submit(self, path, write):
+        """Queue write (see atomic_write) for path and return immediately"""
+        with self._cond:
+            self._raise()
+            self._pending.pop(path, None)
+            self._pending[path] = write
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='checkpoint-writer')
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._thread = None
+                    self._cond.notify_all()
+                    return
+                path, write = self._pending.popitem(last=False)
+            try:
+                atomic_write(path, write)
+            except Exception as e:
+                with self._cond:
+                    self._error = e
+
+    def _raise(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def wait(self):
+        """Block until every submitted file is written"""
+        with self._cond:
+            while self._thread is not None:
+                self._cond.wait()
+            self._raise()
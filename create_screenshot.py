@@ -36,14 +36,13 @@ def create_ui_screenshot():
     game = SnakeGameAI(GAME_WIDTH, GAME_HEIGHT)
     
     # Add some segments to the snake to make it look active
-    game.snake = [
+    game.set_body([
         Point(320, 240),
         Point(300, 240),
         Point(280, 240),
         Point(260, 240),
         Point(240, 240),
-    ]
-    game.head = game.snake[0]
+    ])
     game.score = 4
     game.high_score = 15
     
@@ -5,16 +5,22 @@ This demonstrates the agent can learn to play the game
 import os
 os.environ['SDL_VIDEODRIVER'] = 'dummy'  # Use dummy video driver for headless
 
+import argparse
+import numpy as np
 from snake_game import SnakeGameAI
 from agent import Agent
+from profiling import PhaseProfiler, add_profiler_arguments, profiler_from_args
 import time
 
-def demo_training(num_games=5):
+def demo_training(num_games=5, profiler=None):
     """
     Run a quick training demo
     Args:
         num_games: Number of games to run
+        profiler: optional PhaseProfiler timing each phase of the loop
     """
+    if profiler is None:
+        profiler = PhaseProfiler()
     print("="*50)
     print("Snake Game RL Training Demo")
     print("="*50)
@@ -22,39 +28,48 @@ def demo_training(num_games=5):
     print()
     
     agent = Agent()
-    game = SnakeGameAI()
+    game = SnakeGameAI(render=False)
     
     scores = []
     start_time = time.time()
     
     while agent.n_games < num_games:
-        # Get old state
-        state_old = agent.get_state(game)
+        # Get old state (cached from the previous step)
+        with profiler.phase('get_state'):
+            state_old = agent.get_state(game)
         
         # Get move
-        final_move = agent.get_action(state_old)
+        with profiler.phase('get_action'):
+            final_move = agent.get_action(state_old)
         
         # Perform move and get new state
-        reward, done, score = game.play_step(final_move)
-        state_new = agent.get_state(game)
+        with profiler.phase('env_step'):
+            state_new, reward, done, info = game.step(final_move)
+        score = info['score']
         
         # Train short memory
-        agent.train_short_memory(state_old, final_move, reward, state_new, done)
+        with profiler.phase('train_short'):
+            agent.train_short_memory(state_old, final_move, reward, state_new, done)
         
         # Remember
-        agent.remember(state_old, final_move, reward, state_new, done)
+        with profiler.phase('remember'):
+            agent.remember(state_old, final_move, reward, state_new, done)
         
         if done:
             # Train long memory
-            game.reset()
+            with profiler.phase('env_reset'):
+                game.reset()
             agent.n_games += 1
-            agent.train_long_memory()
+            with profiler.phase('train_long'):
+                agent.train_long_memory()
             
             scores.append(score)
             
             print(f"Game {agent.n_games}: Score = {score}, "
                   f"Avg = {sum(scores)/len(scores):.1f}, "
                   f"Max = {max(scores)}")
+        profiler.step()
+    profiler.close()
     
     elapsed_time = time.time() - start_time
     
@@ -71,9 +86,56 @@ def demo_training(num_games=5):
     print()
     
     # Save the model
-    agent.save_model('demo_model.pth')
+    with profiler.phase('save_model'):
+        agent.save_model('demo_model.pth')
     print("Model saved to ./model/demo_model.pth")
     print()
+    
+    if profiler.enabled:
+        profiler.dump()
+        print()
+
+
+def compare_short_batch(batch_sizes=(1, 4, 16, 64), num_games=100, block=20):
+    """
+    Compare training speed and learning for several short-memory batch sizes
+    Args:
+        batch_sizes: values of Agent(short_batch=K) to run
+        num_games: games per run
+        block: games per point of the learning curve
+    """
+    print("="*50)
+    print("Short-Memory Batch Size Comparison")
+    print("="*50)
+    print()
+    
+    for k in batch_sizes:
+        # Same seeds for every run
+        agent = Agent(short_batch=k, seed=0)
+        game = SnakeGameAI(render=False, seed=0)
+        scores = []
+        steps = 0
+        start_time = time.time()
+        
+        while agent.n_games < num_games:
+            state_old = agent.get_state(game)
+            final_move = agent.get_action(state_old)
+            state_new, reward, done, info = game.step(final_move)
+            agent.train_short_memory(state_old, final_move, reward, state_new, done)
+            agent.remember(state_old, final_move, reward, state_new, done)
+            steps += 1
+            
+            if done:
+                game.reset()
+                agent.n_games += 1
+                agent.train_long_memory()
+                scores.append(info['score'])
+        
+        elapsed_time = time.time() - start_time
+        curve = [np.mean(scores[i:i + block]) for i in range(0, len(scores), block)]
+        print(f"K={k:<4} Steps/Second: {steps/elapsed_time:8.0f}   "
+              f"Mean score per {block} games: " + " ".join(f"{m:.1f}" for m in curve))
+    print()
 
 
 def demo_game_api():
@@ -119,6 +181,17 @@ def demo_game_api():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Snake RL demos')
+    parser.add_argument('--short-batch', type=int, nargs='+', metavar='K',
+                        help='compare short-memory batch sizes instead of the demos')
+    parser.add_argument('--games', type=int, default=100,
+                        help='games per run for --short-batch')
+    add_profiler_arguments(parser)
+    args = parser.parse_args()
+    if args.short_batch:
+        compare_short_batch(args.short_batch, args.games)
+        raise SystemExit
+    
     # Run API demo
     demo_game_api()
     
@@ -126,4 +199,4 @@ if __name__ == '__main__':
     print()
     
     # Run training demo (reduced for quick test)
-    demo_training(num_games=5)
+    demo_training(num_games=5, profiler=profiler_from_args(args))
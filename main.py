@@ -4,11 +4,13 @@ Main UI for Snake Game with Human/Training Mode Switch
 import pygame
 import sys
 import os
+import argparse
 import threading
 import time
 from snake_game import SnakeGameAI, SnakeGameHuman, BLOCK_SIZE, Direction, Point
 from agent import Agent
-import torch
+from tabular_agent import TabularAgent
+from profiling import PhaseProfiler, add_profiler_arguments, profiler_from_args
 
 # Initialize Pygame
 pygame.init()
@@ -65,7 +67,7 @@ class SnakeGameUI:
     """
     Main UI for Snake Game with mode switching
     """
-    def __init__(self):
+    def __init__(self, agent_type='dqn', profiler=None, int8=False):
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption('Snake Game - Human Play & RL Training')
         self.clock = pygame.time.Clock()
@@ -78,6 +80,12 @@ class SnakeGameUI:
         self.human_game = None
         self.ai_game = None
         self.agent = None
+        # 'dqn' (Linear_QNet) or 'tabular' (Q-table)
+        self.agent_type = agent_type
+        # Act with an int8 copy of the loaded DQN model
+        self.int8 = int8
+        # Per-phase timing of train_step (no-op unless enabled)
+        self.profiler = profiler if profiler is not None else PhaseProfiler()
         
         # Training stats
         self.training_games = 0
@@ -103,7 +111,10 @@ class SnakeGameUI:
             self.human_game.high_score = self.high_score
         else:
             self.ai_game = SnakeGameAI(GAME_WIDTH, GAME_HEIGHT)
-            self.agent = Agent()
+            if self.agent_type == 'tabular':
+                self.agent = TabularAgent()
+            else:
+                self.agent = Agent()
             self.ai_game.high_score = self.high_score
             # Try to load existing model
             self.load_model()
@@ -125,13 +136,15 @@ class SnakeGameUI:
     
     def load_model(self):
         """Load the trained model if available"""
+        if self.agent_type == 'tabular':
+            if os.path.exists('./model/q_table.npz'):
+                self.agent.load_model()
+            return
+        
         model_path = './model/model.pth'
         if os.path.exists(model_path):
             try:
-                # Import DEVICE from model module
-                from model import DEVICE
-                self.agent.model.load_state_dict(torch.load(model_path, map_location=DEVICE))
-                print("Model loaded successfully")
+                self.agent.load_model(int8=self.int8)
             except Exception as e:
                 print(f"Error loading model: {e}")
     
@@ -241,37 +254,48 @@ class SnakeGameUI:
         if not self.agent or not self.ai_game:
             return
         
-        # Get old state
-        state_old = self.agent.get_state(self.ai_game)
+        profiler = self.profiler
+        
+        # Get old state (cached from the previous step)
+        with profiler.phase('get_state'):
+            state_old = self.agent.get_state(self.ai_game)
         
         # Get move
-        final_move = self.agent.get_action(state_old)
+        with profiler.phase('get_action'):
+            final_move = self.agent.get_action(state_old)
         
         # Perform move and get new state
-        reward, done, score = self.ai_game.play_step(final_move)
-        state_new = self.agent.get_state(self.ai_game)
+        with profiler.phase('env_step'):
+            state_new, reward, done, info = self.ai_game.step(final_move)
+        score = info['score']
         
         # Train short memory
-        self.agent.train_short_memory(state_old, final_move, reward, state_new, done)
+        with profiler.phase('train_short'):
+            self.agent.train_short_memory(state_old, final_move, reward, state_new, done)
         
         # Remember
-        self.agent.remember(state_old, final_move, reward, state_new, done)
+        with profiler.phase('remember'):
+            self.agent.remember(state_old, final_move, reward, state_new, done)
         
         if done:
             # Train long memory (experience replay)
-            self.ai_game.reset()
+            with profiler.phase('env_reset'):
+                self.ai_game.reset()
             self.agent.n_games += 1
-            self.agent.train_long_memory()
+            with profiler.phase('train_long'):
+                self.agent.train_long_memory()
             
             self.training_games = self.agent.n_games
             
             if score > self.training_record:
                 self.training_record = score
-                self.agent.save_model()
+                with profiler.phase('save_model'):
+                    self.agent.save_model()
             
             if score > self.high_score:
                 self.high_score = score
                 self.save_high_score()
+        profiler.step()
     
     def run(self):
         """Main game loop"""
@@ -335,10 +359,25 @@ class SnakeGameUI:
         if self.mode == 'training':
             self.save_model()
         self.save_high_score()
+        self.profiler.close()
+        if self.profiler.enabled:
+            self.profiler.dump()
         pygame.quit()
         sys.exit()
 
 
 if __name__ == '__main__':
-    game_ui = SnakeGameUI()
+    parser = argparse.ArgumentParser(description='Snake Game with Human/Training Mode Switch')
+    parser.add_argument('--agent', choices=['dqn', 'tabular'], default='dqn',
+                        help='agent used in training mode (default: dqn)')
+    parser.add_argument('--int8', action='store_true',
+                        help='act with an int8-quantized copy of the loaded DQN model '
+                             '(inference only; training keeps updating the float model)')
+    add_profiler_arguments(parser)
+    args = parser.parse_args()
+    if args.int8 and args.agent != 'dqn':
+        parser.error('--int8 needs --agent dqn')
+    
+    game_ui = SnakeGameUI(agent_type=args.agent, profiler=profiler_from_args(args),
+                          int8=args.int8)
     game_ui.run()
@@ -0,0 +1,260 @@
+"""
+Streaming training metrics
+
+A MetricsSink writes one record per finished game and one per time
+interval to size-rotated CSV or JSONL files. It can also keep a
+Prometheus text-format file current for node_exporter's textfile
+collector. In memory it keeps only fixed-size rolling windows, so long
+runs do not grow.
+
+Usage:
+    metrics = MetricsSink('./metrics/train', prom_file='./metrics/snake.prom')
+    while training:
+        ...
+        metrics.add_steps()
+        if done:
+            metrics.episode(score, length, loss=..., epsilon=..., replay_size=...)
+    metrics.close()
+"""
+import csv
+import io
+import json
+import os
+import time
+from collections import deque
+
+# Games in the rolling mean score and length
+WINDOW = 100
+# Seconds between interval records
+INTERVAL = 10.0
+# Steps between clock reads in add_steps, to keep time() out of the hot loop
+CLOCK_EVERY = 256
+MAX_BYTES = 10 * 1024 * 1024
+BACKUPS = 5
+
+EPISODE_FIELDS = ('time', 'game', 'score', 'length', 'loss', 'epsilon', 'replay_size')
+INTERVAL_FIELDS = ('time', 'steps', 'games', 'steps_per_sec', 'games_per_sec', 'mean_score',
+                   'mean_length', 'record', 'loss', 'epsilon', 'replay_size')
+
+
+class RotatingRecordFile:
+    """
+    Append-only CSV or JSONL file that rotates to name.1 .. name.<backups>
+    once it would grow past max_bytes (UTF-8 encoded size on disk)
+    """
+
+    def __init__(self, filename, fields, fmt='jsonl', max_bytes=MAX_BYTES, backups=BACKUPS):
+        if fmt not in ('csv', 'jsonl'):
+            raise ValueError(f"fmt must be 'csv' or 'jsonl', not {fmt!r}")
+        self.filename = filename
+        self.fields = fields
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.backups = backups
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        self.file = open(self.filename, 'ab')
+        self.size = self.file.tell()
+        if self.fmt == 'csv' and self.size == 0:
+            self._write(self._format(dict(zip(self.fields, self.fields))))
+
+    def _format(self, record):
+        if self.fmt == 'jsonl':
+            line = json.dumps({k: record.get(k) for k in self.fields}) + '\n'
+        else:
+            out = io.StringIO()
+            csv.writer(out).writerow(['' if record.get(k) is None else record[k]
+                                      for k in self.fields])
+            line = out.getvalue()
+        return line.encode('utf-8')
+
+    def _write(self, line):
+        self.file.write(line)
+        self.size += len(line)
+
+    def _rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.filename}.{i}'):
+                os.replace(f'{self.filename}.{i}', f'{self.filename}.{i + 1}')
+        if self.backups > 0:
+            os.replace(self.filename, f'{self.filename}.1')
+        else:
+            os.remove(self.filename)
+        self._open()
+
+    def write(self, record):
+        """Append one record (a dict keyed by fields; missing keys are empty)"""
+        line = self._format(record)
+        if self.max_bytes and self.size + len(line) > self.max_bytes and self.size > 0:
+            self._rotate()
+        self._write(line)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class MetricsSink:
+    """
+    Per-episode and per-interval training metrics
+    Args:
+        path: file prefix; records go to <path>.episodes.<fmt> and
+            <path>.intervals.<fmt> (None: keep rolling stats only)
+        fmt: 'jsonl' or 'csv'
+        prom_file: Prometheus text-format file rewritten every interval
+        window: games in the rolling mean score and length
+        interval: seconds between interval records
+        max_bytes, backups: rotation of each record file
+    """
+
+    def __init__(self, path=None, fmt='jsonl', prom_file=None, window=WINDOW, interval=INTERVAL,
+                 max_bytes=MAX_BYTES, backups=BACKUPS):
+        self.episodes_file = None
+        self.intervals_file = None
+        if path is not None:
+            self.episodes_file = RotatingRecordFile(f'{path}.episodes.{fmt}', EPISODE_FIELDS,
+                                                    fmt, max_bytes, backups)
+            self.intervals_file = RotatingRecordFile(f'{path}.intervals.{fmt}', INTERVAL_FIELDS,
+                                                     fmt, max_bytes, backups)
+        self.prom_file = prom_file
+        self.interval = interval
+        self.scores = deque(maxlen=window)
+        self.lengths = deque(maxlen=window)
+        self.steps = 0
+        self.games = 0
+        self.record = 0
+        self.last = {'loss': None, 'epsilon': None, 'replay_size': None}
+        self._mark = (time.time(), 0, 0)
+        self._next_clock = CLOCK_EVERY
+
+    @property
+    def mean_score(self):
+        """Mean score of the last `window` games"""
+        return sum(self.scores) / len(self.scores) if self.scores else 0.0
+
+    @property
+    def mean_length(self):
+        """Mean length in steps of the last `window` games"""
+        return sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def add_steps(self, n=1):
+        """
+        Count n game steps, writing an interval record when one is due
+        (the clock is read once every CLOCK_EVERY steps)
+        """
+        self.steps += n
+        if self.steps < self._next_clock:
+            return
+        self._next_clock = self.steps + CLOCK_EVERY
+        if time.time() - self._mark[0] >= self.interval:
+            self.write_interval()
+
+    def episode(self, score, length, loss=None, epsilon=None, replay_size=None):
+        """
+        Record one finished game
+        Args:
+            score: final score
+            length: steps the game lasted
+            loss: latest training loss (float or 0-d tensor)
+            epsilon: exploration setting at the end of the game
+            replay_size: transitions in replay memory
+        """
+        if loss is not None:
+            loss = float(loss)
+        self.games += 1
+        self.record = max(self.record, score)
+        self.scores.append(score)
+        self.lengths.append(length)
+        self.last = {'loss': loss, 'epsilon': epsilon, 'replay_size': replay_size}
+        if self.episodes_file is not None:
+            self.episodes_file.write({'time': round(time.time(), 3), 'game': self.games,
+                                      'score': score, 'length': length, **self.last})
+
+    def write_interval(self):
+        """Write an interval record and the Prometheus file now"""
+        now = time.time()
+        then, steps, games = self._mark
+        elapsed = max(now - then, 1e-9)
+        record = {
+            'time': round(now, 3),
+            'steps': self.steps,
+            'games': self.games,
+            'steps_per_sec': (self.steps - steps) / elapsed,
+            'games_per_sec': (self.games - games) / elapsed,
+            'mean_score': self.mean_score,
+            'mean_length': self.mean_length,
+            'record': self.record,
+            **self.last,
+        }
+        self._mark = (now, self.steps, self.games)
+        if self.intervals_file is not None:
+            self.intervals_file.write(record)
+            self.intervals_file.flush()
+            self.episodes_file.flush()
+        if self.prom_file is not None:
+            self._write_prometheus(record)
+        return record
+
+    def _write_prometheus(self, record):
+        """Replace prom_file atomically, so scrapers never see half a file"""
+        metrics = (
+            ('snake_steps_total', 'counter', 'Game steps played', record['steps']),
+            ('snake_games_total', 'counter', 'Games finished', record['games']),
+            ('snake_steps_per_second', 'gauge', 'Steps per second over the last interval',
+             record['steps_per_sec']),
+            ('snake_games_per_second', 'gauge', 'Games per second over the last interval',
+             record['games_per_sec']),
+            ('snake_score_mean', 'gauge', 'Mean score of the recent games', record['mean_score']),
+            ('snake_game_length_mean', 'gauge', 'Mean steps per game of the recent games',
+             record['mean_length']),
+            ('snake_score_record', 'gauge', 'Best score so far', record['record']),
+            ('snake_loss', 'gauge', 'Latest training loss', record['loss']),
+            ('snake_epsilon', 'gauge', 'Exploration setting', record['epsilon']),
+            ('snake_replay_size', 'gauge', 'Transitions in replay memory', record['replay_size']),
+        )
+        lines = []
+        for name, kind, help_text, value in metrics:
+            if value is None:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {value}')
+        directory = os.path.dirname(self.prom_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f'{self.prom_file}.tmp'
+        with open(tmp, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp, self.prom_file)
+
+    def close(self):
+        """Write a final interval record and close the files"""
+        self.write_interval()
+        if self.episodes_file is not None:
+            self.episodes_file.close()
+            self.intervals_file.close()
+
+
+def add_metrics_arguments(parser):
+    """Add the --metrics options shared by the training entry points"""
+    parser.add_argument('--metrics', default=None, metavar='PATH',
+                        help='write per-game and per-interval records to PATH.episodes.* '
+                             'and PATH.intervals.*')
+    parser.add_argument('--metrics-format', choices=('jsonl', 'csv'), default='jsonl')
+    parser.add_argument('--metrics-interval', type=float, default=INTERVAL,
+                        help='seconds between interval records')
+    parser.add_argument('--prom-file', default=None,
+                        help='Prometheus text-format file updated every interval')
+
+
+def metrics_from_args(args):
+    """Build the MetricsSink described by add_metrics_arguments options"""
+    return MetricsSink(args.metrics, args.metrics_format, args.prom_file,
+                       interval=args.metrics_interval)
@@ -7,6 +7,9 @@ import torch.optim as optim
 import torch.nn.functional as F
 import numpy as np
 import os
+import copy
+from observation import NUM_STATES, pack_states, unpack_states
+from checkpoint import atomic_write
 
 # Check CUDA availability and handle cuDNN version issues
 def check_cuda_availability():
@@ -48,7 +51,7 @@ class Linear_QNet(nn.Module):
             os.makedirs(model_folder_path)
             
         file_name = os.path.join(model_folder_path, file_name)
-        torch.save(self.state_dict(), file_name)
+        atomic_write(file_name, lambda f: torch.save(self.state_dict(), f))
 
 
 class QTrainer:
@@ -61,12 +64,27 @@ class QTrainer:
         self.model = model
         self.optimizer = optim.Adam(model.parameters(), lr=self.lr)
         self.criterion = nn.MSELoss()
+        # Loss of the latest step as a 0-d tensor (read it with float())
+        self.last_loss = None
         
-    def train_step(self, state, action, reward, next_state, done):
-        state = torch.tensor(np.array(state), dtype=torch.float).to(DEVICE)
-        next_state = torch.tensor(np.array(next_state), dtype=torch.float).to(DEVICE)
-        action = torch.tensor(action, dtype=torch.long).to(DEVICE)
-        reward = torch.tensor(reward, dtype=torch.float).to(DEVICE)
+    def train_step(self, state, action, reward, next_state, done, weights=None):
+        """
+        One optimizer step on a single transition or a batch of them
+        Args:
+            state, next_state: (11,) or (n, 11) states
+            action: (3,) or (n, 3) one-hot actions
+            reward, done: scalars or (n,) arrays
+            weights: optional (n,) importance-sampling weights for
+                prioritized replay
+        Returns:
+            None, or the (n,) absolute TD errors as a numpy array when
+            weights are given
+        """
+        state = torch.as_tensor(np.asarray(state), dtype=torch.float, device=DEVICE)
+        next_state = torch.as_tensor(np.asarray(next_state), dtype=torch.float, device=DEVICE)
+        action = torch.as_tensor(np.asarray(action), dtype=torch.long, device=DEVICE)
+        reward = torch.as_tensor(np.asarray(reward), dtype=torch.float, device=DEVICE)
+        done = torch.as_tensor(np.asarray(done), dtype=torch.bool, device=DEVICE)
         # (n, x)
         
         if len(state.shape) == 1:
@@ -75,24 +93,191 @@ class QTrainer:
             next_state = torch.unsqueeze(next_state, 0)
             action = torch.unsqueeze(action, 0)
             reward = torch.unsqueeze(reward, 0)
-            done = (done, )
+            done = torch.unsqueeze(done, 0)
             
-        # 1: predicted Q values with current state
-        pred = self.model(state)
+        # 1: predicted Q values with current and next states, in one
+        # forward pass over the whole batch
+        n = state.shape[0]
+        q_values = self.model(torch.cat((state, next_state)))
+        pred = q_values[:n]
+        next_q = q_values[n:].max(dim=1)[0]
+        
+        # 2: Q_new = r + y * max(next_predicted Q value) -> only if not done
+        q_new = torch.where(done, reward, reward + self.gamma * next_q)
         
-        target = pred.clone()
-        for idx in range(len(done)):
-            Q_new = reward[idx]
-            if not done[idx]:
-                Q_new = reward[idx] + self.gamma * torch.max(self.model(next_state[idx]))
-                
-            target[idx][torch.argmax(action[idx]).item()] = Q_new
-    
-        # 2: Q_new = r + y * max(next_predicted Q value) -> only do this if not done
-        # pred.clone()
         # preds[argmax(action)] = Q_new
+        action_idx = torch.argmax(action, dim=1, keepdim=True)
+        target = pred.scatter(1, action_idx, q_new.unsqueeze(1))
+        
         self.optimizer.zero_grad()
-        loss = self.criterion(target, pred)
+        if weights is None:
+            loss = self.criterion(target, pred)
+        else:
+            weights = torch.as_tensor(np.asarray(weights), dtype=torch.float, device=DEVICE)
+            loss = (weights.unsqueeze(1) * (target - pred) ** 2).mean()
         loss.backward()
         
         self.optimizer.step()
+        self.last_loss = loss.detach()
+        
+        if weights is not None:
+            td_error = q_new - pred.gather(1, action_idx).squeeze(1)
+            return td_error.detach().abs().cpu().numpy()
+
+
+def quantized_engine():
+    """Quantized CPU backend: fbgemm/x86 on x86, qnnpack on ARM"""
+    engines = torch.backends.quantized.supported_engines
+    for engine in ('fbgemm', 'x86', 'qnnpack'):
+        if engine in engines:
+            return engine
+    raise RuntimeError(f"No int8 backend available (supported: {engines})")
+
+
+class QuantizedQNet(nn.Module):
+    """
+    Int8 Linear_QNet for CPU inference
+
+    Weights are int8 with one symmetric scale per output channel;
+    activations are uint8 with scales calibrated on sample states.
+    Build it with quantize_model().
+    """
+    def __init__(self, model):
+        super().__init__()
+        self.quant = torch.quantization.QuantStub()
+        self.linear1 = copy.deepcopy(model.linear1)
+        self.relu1 = nn.ReLU()
+        self.linear2 = copy.deepcopy(model.linear2)
+        self.relu2 = nn.ReLU()
+        self.linear3 = copy.deepcopy(model.linear3)
+        self.dequant = torch.quantization.DeQuantStub()
+
+    def forward(self, x):
+        x = self.quant(x)
+        x = self.relu1(self.linear1(x))
+        x = self.relu2(self.linear2(x))
+        x = self.linear3(x)
+        return self.dequant(x)
+
+
+def quantize_model(model, calibration_states, engine=None):
+    """
+    Int8 copy of a Linear_QNet
+    Args:
+        model: trained Linear_QNet (left unchanged)
+        calibration_states: (n, 11) states, e.g. from replay memory, used
+            to pick activation scales
+        engine: quantized backend, default quantized_engine()
+    Returns:
+        QuantizedQNet on the CPU
+    """
+    engine = engine or quantized_engine()
+    torch.backends.quantized.engine = engine
+    qmodel = QuantizedQNet(model).cpu().eval()
+    qmodel = torch.quantization.fuse_modules(qmodel, [['linear1', 'relu1'], ['linear2', 'relu2']])
+    qmodel.qconfig = torch.quantization.QConfig(
+        activation=torch.quantization.MinMaxObserver.with_args(
+            dtype=torch.quint8, reduce_range=(engine != 'qnnpack')),
+        weight=torch.quantization.PerChannelMinMaxObserver.with_args(
+            dtype=torch.qint8, qscheme=torch.per_channel_symmetric))
+    torch.quantization.prepare(qmodel, inplace=True)
+
+    # Calibration: record activation ranges
+    with torch.no_grad():
+        qmodel(torch.as_tensor(np.asarray(calibration_states), dtype=torch.float))
+    torch.quantization.convert(qmodel, inplace=True)
+    return qmodel
+
+
+def quantization_report(model, qmodel, states=None):
+    """
+    Compare an int8 model with its float original
+    Args:
+        states: (n, 11) states to compare on, default all 2048 binary states
+    Returns:
+        dict with the fraction of states where the greedy actions agree
+        and the largest absolute Q-value difference
+    """
+    if states is None:
+        states = unpack_states(np.arange(NUM_STATES))
+    x = torch.as_tensor(np.asarray(states), dtype=torch.float)
+    device = next(model.parameters()).device
+    with torch.no_grad():
+        q_float = model(x.to(device)).cpu().numpy()
+        q_int8 = qmodel(x).numpy()
+    return {
+        'states': len(x),
+        'action_agreement': float(np.mean(q_float.argmax(axis=1) == q_int8.argmax(axis=1))),
+        'max_q_error': float(np.abs(q_float - q_int8).max()),
+    }
+
+
+class QValueCache:
+    """
+    Greedy actions of a Q network, cached per packed 11-bit state
+
+    The observation space has at most 2048 states, so Q-values can be
+    kept in a table and greedy action selection becomes an array lookup.
+    Call on_update() after each optimizer step and invalidate() after
+    loading new weights.
+
+    With refresh_every=1 the cache is exact: every update marks all
+    entries stale and a stale state costs one forward pass on its next
+    lookup. With refresh_every=K the table goes stale only every K
+    updates, and then all states seen so far are recomputed in a single
+    batched forward pass.
+    """
+
+    def __init__(self, model, refresh_every=1, device=DEVICE):
+        self.model = model
+        self.refresh_every = refresh_every
+        self.device = device
+        self.q_table = np.zeros((NUM_STATES, 3), dtype=np.float32)
+        self.actions = np.zeros(NUM_STATES, dtype=np.int64)
+        self.seen = np.zeros(NUM_STATES, dtype=np.bool_)
+        # An entry is fresh when its generation matches the cache's
+        self.entry_generation = np.full(NUM_STATES, -1, dtype=np.int64)
+        self.generation = 0
+        self._updates = 0
+
+    def invalidate(self):
+        """Mark every entry stale and refill the states seen so far"""
+        self.generation += 1
+        self._updates = 0
+        if self.refresh_every > 1:
+            self.refresh()
+
+    def on_update(self):
+        """Count one optimizer step, going stale every refresh_every steps"""
+        self._updates += 1
+        if self._updates >= self.refresh_every:
+            self.invalidate()
+
+    def refresh(self, codes=None):
+        """Recompute the given codes (default: all seen) in one forward pass"""
+        if codes is None:
+            codes = np.flatnonzero(self.seen)
+        if len(codes) == 0:
+            return
+        states = torch.as_tensor(unpack_states(codes), dtype=torch.float, device=self.device)
+        with torch.no_grad():
+            q = self.model(states).cpu().numpy()
+        self.q_table[codes] = q
+        self.actions[codes] = q.argmax(axis=1)
+        self.seen[codes] = True
+        self.entry_generation[codes] = self.generation
+
+    def greedy_action(self, state):
+        """Index of the best action for one (11,) binary state"""
+        code = int(pack_states(state))
+        if self.entry_generation[code] != self.generation:
+            self.refresh(np.array([code]))
+        return int(self.actions[code])
+
+    def greedy_actions(self, states):
+        """(n,) best action indices for (n, 11) states, one forward pass for all misses"""
+        codes = pack_states(states)
+        stale = codes[self.entry_generation[codes] != self.generation]
+        if len(stale):
+            self.refresh(np.unique(stale))
+        return self.actions[codes]
@@ -0,0 +1,130 @@
+"""
+NumPy-only inference for trained Linear_QNet policies
+
+Export a checkpoint once (this step needs torch):
+    python numpy_policy.py export ./model/model.pth ./model/model.npz
+Then watch the policy play without importing torch:
+    python numpy_policy.py play ./model/model.npz
+"""
+import argparse
+import os
+import sys
+import zipfile
+import numpy as np
+from observation import NUM_STATES, pack_states, unpack_states
+
+LAYERS = ('linear1', 'linear2', 'linear3')
+
+
+def export_npz(checkpoint, out_path):
+    """
+    Write a Linear_QNet state_dict as a flat, uncompressed .npz file
+    Args:
+        checkpoint: path to a .pth state_dict, or the state_dict itself
+        out_path: .npz file to write
+    """
+    import torch
+    if isinstance(checkpoint, str):
+        checkpoint = torch.load(checkpoint, map_location='cpu')
+    arrays = {name: tensor.detach().cpu().numpy().astype(np.float32)
+              for name, tensor in checkpoint.items()}
+    folder = os.path.dirname(out_path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    # Uncompressed, so load_npz can memory-map each array in place
+    np.savez(out_path, **arrays)
+
+
+def load_npz(path):
+    """
+    Memory-map every array of an uncompressed .npz file
+    Returns:
+        dict of read-only arrays backed by the file; compressed members
+        are read into memory instead
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as raw:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            # Local file header: 30 fixed bytes, then file name and extra field
+            raw.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(raw.read(4), dtype='<u2')
+            start = info.header_offset + 30 + int(name_len) + int(extra_len)
+            raw.seek(start)
+            if np.lib.format.read_magic(raw) == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(raw)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(raw)
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=raw.tell(),
+                                     shape=shape, order='F' if fortran_order else 'C')
+    return arrays
+
+
+class NumpyQNet:
+    """
+    Forward pass and greedy actions of an exported Linear_QNet
+
+    Greedy actions for all 2048 binary states are computed once at load
+    time, so get_action is a table lookup.
+    """
+
+    def __init__(self, path):
+        weights = load_npz(path)
+        self.layers = [(weights[f'{name}.weight'], weights[f'{name}.bias']) for name in LAYERS]
+        self.actions = self.forward(unpack_states(np.arange(NUM_STATES))).argmax(axis=1)
+
+    def forward(self, x):
+        """Q-values for a (11,) state or (n, 11) states"""
+        x = np.asarray(x, dtype=np.float32)
+        for i, (weight, bias) in enumerate(self.layers):
+            x = x @ weight.T + bias
+            if i < len(self.layers) - 1:
+                x = np.maximum(x, 0)
+        return x
+
+    def predict(self, states):
+        """Greedy action indices for (n, 11) binary states"""
+        return self.actions[pack_states(states)]
+
+    def get_action(self, state):
+        """Greedy one-hot [straight, right, left] action for one state"""
+        final_move = [0, 0, 0]
+        final_move[self.actions[pack_states(state)]] = 1
+        return final_move
+
+
+def play(path):
+    """Watch an exported policy play in the pygame window"""
+    from snake_game import SnakeGameAI
+    policy = NumpyQNet(path)
+    game = SnakeGameAI()
+    while True:
+        _, _, done, info = game.step(policy.get_action(game.get_state()))
+        if done:
+            game.update_high_score()
+            print(f"Score: {info['score']}, High Score: {game.high_score}")
+            game.reset()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='NumPy-only Linear_QNet inference')
+    commands = parser.add_subparsers(dest='command')
+    export_cmd = commands.add_parser('export', help='convert a .pth checkpoint to .npz')
+    export_cmd.add_argument('checkpoint', nargs='?', default='./model/model.pth')
+    export_cmd.add_argument('out', nargs='?', default='./model/model.npz')
+    play_cmd = commands.add_parser('play', help='play with an exported policy')
+    play_cmd.add_argument('model', nargs='?', default='./model/model.npz')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_npz(args.checkpoint, args.out)
+        print(f"Exported {args.checkpoint} to {args.out}")
+    elif args.command == 'play':
+        play(args.model)
+    else:
+        parser.print_help()
+        sys.exit(1)
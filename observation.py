@@ -0,0 +1,102 @@
+"""
+Vectorized 11-feature observations for batches of Snake games
+
+Produces exactly the vector of SnakeEngine.get_state for many games at
+once, so models trained on either path are interchangeable.
+"""
+import numpy as np
+from snake_engine import BLOCK_SIZE, Direction, DIRECTION_CODE, DIRECTION_DELTA, TURN_OFFSET
+
+STATE_SIZE = 11
+# Every state feature is binary, so a state packs into an 11-bit code
+NUM_STATES = 1 << STATE_SIZE
+PACK_WEIGHTS = 1 << np.arange(STATE_SIZE)
+
+# Movement tables indexed by SnakeEngine direction codes (clockwise from RIGHT)
+DX = np.array([dx for dx, dy in DIRECTION_DELTA], dtype=np.int32)
+DY = np.array([dy for dx, dy in DIRECTION_DELTA], dtype=np.int32)
+TURN = np.array(TURN_OFFSET, dtype=np.int32)
+
+# Direction codes in the order get_state lists them: left, right, up, down
+STATE_DIRECTIONS = tuple(DIRECTION_CODE[d] for d in
+                         (Direction.LEFT, Direction.RIGHT, Direction.UP, Direction.DOWN))
+
+
+def pack_states(states):
+    """Bitmask codes of one (11,) state or a batch of (n, 11) states"""
+    return np.dot(np.asarray(states), PACK_WEIGHTS)
+
+
+def unpack_states(codes):
+    """(n, 11) uint8 states for an array of bitmask codes"""
+    codes = np.asarray(codes)
+    return ((codes[:, None] >> np.arange(STATE_SIZE)) & 1).astype(np.uint8)
+
+
+class ObservationBuilder:
+    """
+    Fills a preallocated (N, 11) uint8 array with get_state features
+    """
+
+    def __init__(self, num_envs):
+        self.out = np.zeros((num_envs, STATE_SIZE), dtype=np.uint8)
+        self._dirs = np.zeros(num_envs, dtype=np.int32)
+
+    def build(self, head_x, head_y, directions, food_x, food_y, blocked):
+        """
+        Compute the features of every game
+        Args:
+            head_x, head_y: (N,) head cells
+            directions: (N,) direction codes
+            food_x, food_y: (N,) food cells
+            blocked: callable taking (N,) cell x and y arrays, possibly off
+                the board, and returning (N,) booleans for wall or body
+        Returns:
+            the builder's (N, 11) uint8 output array
+        """
+        out = self.out
+        # Danger straight, right, left
+        for k, offset in enumerate(TURN):
+            np.add(directions, offset, out=self._dirs)
+            np.bitwise_and(self._dirs, 3, out=self._dirs)
+            out[:, k] = blocked(head_x + DX[self._dirs], head_y + DY[self._dirs])
+
+        # Move direction
+        for k, code in enumerate(STATE_DIRECTIONS):
+            out[:, 3 + k] = directions == code
+
+        # Food location
+        out[:, 7] = food_x < head_x  # food left
+        out[:, 8] = food_x > head_x  # food right
+        out[:, 9] = food_y < head_y  # food up
+        out[:, 10] = food_y > head_y  # food down
+        return out
+
+
+def get_states(games, builder=None):
+    """
+    Batched SnakeEngine.get_state for a list of games on one board size
+    Args:
+        games: SnakeEngine instances
+        builder: optional ObservationBuilder for len(games) games to reuse
+    Returns:
+        (len(games), 11) uint8 array, owned by the builder
+    """
+    if builder is None:
+        builder = ObservationBuilder(len(games))
+    cols = games[0].cols
+    rows = games[0].rows
+    head_x = np.array([g._head[0] for g in games], dtype=np.int32)
+    head_y = np.array([g._head[1] for g in games], dtype=np.int32)
+    directions = np.array([g._dir for g in games], dtype=np.int32)
+    food_x = np.array([g.food.x // BLOCK_SIZE for g in games], dtype=np.int32)
+    food_y = np.array([g.food.y // BLOCK_SIZE for g in games], dtype=np.int32)
+    occupancy = np.stack([np.frombuffer(g._occupancy, dtype=np.uint8) for g in games])
+    rows_index = np.arange(len(games))
+
+    def blocked(x, y):
+        outside = (x < 0) | (x >= cols) | (y < 0) | (y >= rows)
+        cell = np.clip(y, 0, rows - 1) * cols + np.clip(x, 0, cols - 1)
+        return outside | (occupancy[rows_index, cell] > 0)
+
+    return builder.build(head_x, head_y, directions, food_x, food_y, blocked)
@@ -0,0 +1,190 @@
+"""
+Multi-process actor/learner training
+
+Several actor processes each step a group of headless SnakeGameAI games
+with an epsilon-greedy copy of Linear_QNet. They push transitions through
+shared-memory rings to the learner (this process), which trains on replay
+batches continuously and broadcasts its weights back through shared
+memory every few updates.
+
+Usage:
+    python parallel_train.py --actors 4 --envs-per-actor 8 --max-games 2000
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Actors never open a window
+
+import argparse
+import multiprocessing as mp
+import queue
+import time
+from collections import deque
+import numpy as np
+import torch
+from agent import Agent
+from model import Linear_QNet, QValueCache
+from observation import ObservationBuilder, get_states
+from shared_buffers import SharedWeights, TransitionRing
+from snake_engine import spawn_seeds
+from snake_game import SnakeGameAI
+
+RING_CAPACITY = 1 << 16
+# Learner updates between weight broadcasts
+SYNC_EVERY = 10
+
+
+def actor_loop(ring, weights, games, scores, stop, num_envs, seed):
+    """
+    Body of an actor process: step num_envs games until stop is set
+    Args:
+        ring: TransitionRing this actor writes to
+        weights: SharedWeights published by the learner
+        games: shared count of finished games, drives epsilon
+        scores: queue receiving the score of each finished game
+        stop: Event set by the learner to shut down
+        seed: seed for this actor's games and exploration
+    """
+    torch.set_num_threads(1)
+    *env_seeds, action_seed = spawn_seeds(seed, num_envs + 1)
+    envs = [SnakeGameAI(render=False, seed=s) for s in env_seeds]
+    model = weights.attach(Linear_QNet(11, 256, 3))
+    cache = QValueCache(model, device=torch.device('cpu'))
+    version = -1
+    rng = np.random.default_rng(action_seed)
+    builder = ObservationBuilder(num_envs)
+    rewards = np.zeros(num_envs, dtype=np.float32)
+    dones = np.zeros(num_envs, dtype=np.bool_)
+    states = get_states(envs, builder).copy()
+
+    while not stop.is_set():
+        if weights.version != version:
+            version = weights.sync(cache)
+
+        # Epsilon-greedy, same schedule as Agent.get_action
+        epsilon = 80 - games.value
+        moves = cache.greedy_actions(states)
+        explore = rng.integers(0, 201, num_envs) < epsilon
+        moves = np.where(explore, rng.integers(0, 3, num_envs), moves)
+
+        for i, game in enumerate(envs):
+            rewards[i], dones[i], _ = game.play_step(int(moves[i]))
+        next_states = get_states(envs, builder)
+        if not ring.push(states, moves, rewards, next_states, dones, stop):
+            break
+
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                scores.put(envs[i].score)
+                envs[i].reset()
+            with games.get_lock():
+                games.value += int(dones.sum())
+            next_states = get_states(envs, builder)
+        states = next_states.copy()
+
+
+def train_parallel(num_actors=None, envs_per_actor=8, max_games=None, max_seconds=None,
+                   sync_every=SYNC_EVERY, log_every=5.0, seed=None, max_steps=None,
+                   model_file='model.pth'):
+    """
+    Train one learner on the experience of several actor processes
+    Args:
+        num_actors: actor processes (default: one per core, minus the learner's)
+        envs_per_actor: games stepped in lockstep by each actor
+        max_games, max_seconds, max_steps: stop after this many games,
+            seconds or collected transitions (run until interrupted if
+            all are None)
+        sync_every: learner updates between weight broadcasts
+        log_every: seconds between progress lines
+        seed: root seed; each actor gets its own stream spawned from it.
+            Actor streams are reproducible, their interleaving is not.
+        model_file: saved under ./model on every new record (None: never save)
+    Returns:
+        the trained Agent
+    """
+    if num_actors is None:
+        num_actors = max(1, (os.cpu_count() or 2) - 1)
+    # spawn: actors must not inherit the learner's CUDA or OpenMP state
+    ctx = mp.get_context('spawn')
+    learner_seed, *actor_seeds = spawn_seeds(seed, num_actors + 1)
+    agent = Agent(seed=learner_seed)
+    weights = SharedWeights(agent.model, ctx)
+    games = ctx.Value('q', 0)
+    scores = ctx.Queue()
+    stop = ctx.Event()
+    rings = [TransitionRing(RING_CAPACITY, ctx) for _ in range(num_actors)]
+    actors = [ctx.Process(target=actor_loop, daemon=True,
+                          args=(ring, weights, games, scores, stop, envs_per_actor, actor_seed))
+              for ring, actor_seed in zip(rings, actor_seeds)]
+    for actor in actors:
+        actor.start()
+
+    record = 0
+    recent = deque(maxlen=100)
+    steps = updates = 0
+    start = last_log = time.time()
+    try:
+        while True:
+            for ring in rings:
+                batch = ring.drain()
+                if batch is not None:
+                    agent.memory.extend(*batch)
+                    steps += len(batch[2])
+
+            while True:
+                try:
+                    score = scores.get_nowait()
+                except queue.Empty:
+                    break
+                recent.append(score)
+                if score > record:
+                    record = score
+                    if model_file is not None:
+                        agent.save_model(model_file)
+            agent.n_games = games.value
+
+            if len(agent.memory) == 0:
+                time.sleep(0.01)
+                continue
+            agent.train_long_memory()
+            updates += 1
+            if updates % sync_every == 0:
+                weights.publish(agent.model)
+
+            now = time.time()
+            if now - last_log >= log_every:
+                elapsed = now - start
+                mean = sum(recent) / len(recent) if recent else 0.0
+                print(f"Games {agent.n_games}, Record {record}, Mean(100) {mean:.1f}, "
+                      f"Steps/s {steps / elapsed:.0f}, Updates/s {updates / elapsed:.1f}")
+                last_log = now
+            if max_games is not None and agent.n_games >= max_games:
+                break
+            if max_seconds is not None and now - start >= max_seconds:
+                break
+            if max_steps is not None and steps >= max_steps:
+                break
+    finally:
+        stop.set()
+        for actor in actors:
+            actor.join(timeout=5)
+            if actor.is_alive():
+                actor.terminate()
+    return agent
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Multi-process actor/learner training')
+    parser.add_argument('--actors', type=int, default=None,
+                        help='actor processes (default: cores - 1)')
+    parser.add_argument('--envs-per-actor', type=int, default=8)
+    parser.add_argument('--max-games', type=int, default=None)
+    parser.add_argument('--max-seconds', type=float, default=None)
+    parser.add_argument('--max-steps', type=int, default=None)
+    parser.add_argument('--sync-every', type=int, default=SYNC_EVERY)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--model', default='model.pth',
+                        help='file under ./model saved on each new record')
+    parser.add_argument('--no-save', action='store_true', help='never save the model')
+    args = parser.parse_args()
+    train_parallel(args.actors, args.envs_per_actor, args.max_games, args.max_seconds,
+                   args.sync_every, seed=args.seed, max_steps=args.max_steps,
+                   model_file=None if args.no_save else args.model)
@@ -0,0 +1,213 @@
+"""
+Per-phase timing for the training loops
+
+A PhaseProfiler keeps the last `window` durations of each named phase
+(env step, get_state, get_action, training, saving) and reports their
+p50/p95/p99 on demand. It can also run cProfile or torch.profiler over a
+window of steps. When disabled, every hook is a no-op.
+
+Usage:
+    profiler = PhaseProfiler(enabled=True, capture=(1000, 1100))
+    while training:
+        with profiler.phase('get_action'):
+            move = agent.get_action(state)
+        ...
+        profiler.step()
+    profiler.dump()
+"""
+import signal
+import time
+import numpy as np
+
+# Durations kept per phase
+WINDOW = 10_000
+PERCENTILES = (50, 95, 99)
+
+
+class _NullPhase:
+    """Context manager that does nothing, shared by every disabled phase"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """Times one pass through a phase into its ring of durations"""
+
+    __slots__ = ('ring', 'start')
+
+    def __init__(self, ring):
+        self.ring = ring
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.ring.add(time.perf_counter() - self.start)
+        return False
+
+
+class _Ring:
+    """The last `size` durations of a phase, plus a running count"""
+
+    __slots__ = ('values', 'count')
+
+    def __init__(self, size):
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count = 0
+
+    def add(self, seconds):
+        self.values[self.count % len(self.values)] = seconds
+        self.count += 1
+
+    def recent(self):
+        return self.values[:min(self.count, len(self.values))]
+
+
+class PhaseProfiler:
+    """
+    Rolling per-phase latency percentiles, plus an optional profiler capture
+    Args:
+        enabled: collect timings (False makes every hook a no-op)
+        window: durations kept per phase
+        capture: (first_step, last_step) to run a full profiler over, or None
+        capture_mode: 'cprofile' or 'torch'
+        capture_file: where the capture is written (.prof for cProfile,
+            a Chrome trace .json for torch)
+    """
+
+    def __init__(self, enabled=False, window=WINDOW, capture=None, capture_mode='cprofile',
+                 capture_file=None):
+        if capture_mode not in ('cprofile', 'torch'):
+            raise ValueError(f"capture_mode must be 'cprofile' or 'torch', not {capture_mode!r}")
+        self.enabled = enabled
+        self.window = window
+        self.capture = capture
+        self.capture_mode = capture_mode
+        if capture_file is None:
+            capture_file = 'profile.prof' if capture_mode == 'cprofile' else 'trace.json'
+        self.capture_file = capture_file
+        self.steps = 0
+        self._phases = {}
+        self._rings = {}
+        self._capturing = None
+
+    def phase(self, name):
+        """Context manager timing one pass through the named phase"""
+        if not self.enabled:
+            return _NULL_PHASE
+        phase = self._phases.get(name)
+        if phase is None:
+            ring = self._rings[name] = _Ring(self.window)
+            phase = self._phases[name] = _Phase(ring)
+        return phase
+
+    def step(self):
+        """Mark the end of one loop iteration (drives the capture window)"""
+        if self.capture is None:
+            return
+        self.steps += 1
+        first, last = self.capture
+        if self.steps == first:
+            self._start_capture()
+        elif self.steps == last + 1:
+            self._stop_capture()
+
+    def _start_capture(self):
+        if self.capture_mode == 'cprofile':
+            import cProfile
+            self._capturing = cProfile.Profile()
+            self._capturing.enable()
+        else:
+            import torch.profiler
+            self._capturing = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True)
+            self._capturing.__enter__()
+        print(f"Profiler capture started at step {self.steps}")
+
+    def _stop_capture(self):
+        if self._capturing is None:
+            return
+        if self.capture_mode == 'cprofile':
+            self._capturing.disable()
+            self._capturing.dump_stats(self.capture_file)
+        else:
+            self._capturing.__exit__(None, None, None)
+            self._capturing.export_chrome_trace(self.capture_file)
+        self._capturing = None
+        print(f"Profiler capture written to {self.capture_file}")
+
+    def close(self):
+        """Finish a capture cut short by the end of the run"""
+        self._stop_capture()
+
+    def stats(self):
+        """
+        Percentiles of the recent durations of every phase
+        Returns:
+            dict of phase -> {'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'}
+        """
+        stats = {}
+        for name, ring in self._rings.items():
+            recent = ring.recent() * 1e3
+            if len(recent) == 0:
+                continue
+            row = {'count': ring.count, 'mean_ms': float(recent.mean())}
+            for p, value in zip(PERCENTILES, np.percentile(recent, PERCENTILES)):
+                row[f'p{p}_ms'] = float(value)
+            stats[name] = row
+        return stats
+
+    def dump(self):
+        """Print the percentile table of every phase"""
+        stats = self.stats()
+        if not stats:
+            print("No phase timings collected")
+            return
+        print(f"{'phase':<14}{'count':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, row in stats.items():
+            print(f"{name:<14}{row['count']:>10}{row['mean_ms']:>10.3f}{row['p50_ms']:>10.3f}"
+                  f"{row['p95_ms']:>10.3f}{row['p99_ms']:>10.3f}")
+
+    def dump_on_signal(self, signum=None):
+        """
+        Print the table whenever the process receives signum
+        (SIGUSR1 by default, e.g. `kill -USR1 <pid>`; not on Windows)
+        """
+        if signum is None:
+            signum = getattr(signal, 'SIGUSR1', None)
+            if signum is None:
+                return
+        signal.signal(signum, lambda *_: self.dump())
+
+
+def add_profiler_arguments(parser):
+    """Add the --profile options shared by the training entry points"""
+    parser.add_argument('--profile', action='store_true',
+                        help='time each training phase and print p50/p95/p99 at the end '
+                             '(and on SIGUSR1)')
+    parser.add_argument('--profile-steps', default=None, metavar='FIRST:LAST',
+                        help='run a full profiler over this step range')
+    parser.add_argument('--profile-mode', choices=('cprofile', 'torch'), default='cprofile')
+    parser.add_argument('--profile-file', default=None,
+                        help='output of the --profile-steps capture')
+
+
+def profiler_from_args(args):
+    """Build the PhaseProfiler described by add_profiler_arguments options"""
+    capture = None
+    if args.profile_steps:
+        first, last = args.profile_steps.split(':')
+        capture = (int(first), int(last))
+    profiler = PhaseProfiler(enabled=args.profile, capture=capture,
+                             capture_mode=args.profile_mode, capture_file=args.profile_file)
+    if profiler.enabled:
+        profiler.dump_on_signal()
+    return profiler
@@ -0,0 +1,240 @@
+"""
+Experience replay memory on preallocated NumPy arrays
+"""
+import numpy as np
+from snake_engine import action_index
+
+# Defaults shared by the DQN and tabular agents
+MAX_MEMORY = 100_000
+BATCH_SIZE = 1000
+# Transitions per short-memory update (1 = one update per frame)
+SHORT_BATCH = 1
+
+
+class ReplayMemory:
+    """
+    Fixed-capacity ring buffer of transitions
+
+    A transition takes 28 bytes of contiguous storage: two uint8 states,
+    an int8 action index, a float32 reward and a bool done. Once full,
+    new transitions overwrite the oldest ones.
+    """
+
+    def __init__(self, capacity, state_size=11, action_size=3, seed=None):
+        self.capacity = capacity
+        self.action_size = action_size
+        self.states = np.zeros((capacity, state_size), dtype=np.uint8)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.uint8)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.bool_)
+        self.position = 0
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+        self._one_hot = np.eye(action_size, dtype=np.int8)
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        """Forget every stored transition"""
+        self.position = 0
+        self.size = 0
+
+    def append(self, state, action, reward, next_state, done):
+        """
+        Store one transition
+        Args:
+            action: one-hot [straight, right, left] list/array or its index
+        """
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action_index(action)
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        """
+        Store a batch of transitions in one write
+        Args:
+            actions: (n,) action indices or (n, 3) one-hot actions
+        Returns:
+            (n,) buffer indices written (the last capacity transitions
+            only, if n exceeds the capacity)
+        """
+        actions = np.asarray(actions)
+        if actions.ndim == 2:
+            actions = actions.argmax(axis=1)
+        n = min(len(actions), self.capacity)
+        idx = (self.position + np.arange(n)) % self.capacity
+        self.states[idx] = np.asarray(states)[-n:]
+        self.actions[idx] = actions[-n:]
+        self.rewards[idx] = np.asarray(rewards)[-n:]
+        self.next_states[idx] = np.asarray(next_states)[-n:]
+        self.dones[idx] = np.asarray(dones)[-n:]
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return idx
+
+    def snapshot(self):
+        """Copy of the stored transitions, oldest first, as a dict of arrays"""
+        idx = (self.position - self.size + np.arange(self.size)) % self.capacity
+        return {'states': self.states[idx], 'actions': self.actions[idx],
+                'rewards': self.rewards[idx], 'next_states': self.next_states[idx],
+                'dones': self.dones[idx]}
+
+    def restore(self, snapshot):
+        """
+        Replace the contents with a snapshot (the newest capacity
+        transitions, if it holds more)
+        Returns:
+            buffer indices written
+        """
+        self.clear()
+        return self.extend(snapshot['states'], snapshot['actions'], snapshot['rewards'],
+                           snapshot['next_states'], snapshot['dones'])
+
+    def sample(self, batch_size):
+        """
+        Draw a batch of distinct transitions, or every transition if fewer
+        are stored
+        Returns:
+            states (B, 11) uint8, actions (B, 3) one-hot int8,
+            rewards (B,) float32, next_states (B, 11) uint8, dones (B,) bool
+        """
+        if self.size > batch_size:
+            idx = self.rng.choice(self.size, batch_size, replace=False)
+        else:
+            idx = np.arange(self.size)
+        return self.batch(idx)
+
+    def batch(self, idx):
+        """Gather the transitions at the given buffer indices"""
+        return (self.states[idx], self._one_hot[self.actions[idx]], self.rewards[idx],
+                self.next_states[idx], self.dones[idx])
+
+
+class SumTree:
+    """
+    Binary tree whose internal nodes hold the sum of their children
+
+    Leaves store one priority per buffer slot. Updates and prefix-sum
+    lookups walk one root-to-leaf path, O(log n), and both are
+    vectorized over a batch of slots.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.depth = max(1, int(np.ceil(np.log2(capacity))))
+        self.leaves = 1 << self.depth
+        # Node 1 is the root, node k has children 2k and 2k+1
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    @property
+    def total(self):
+        """Sum of all priorities"""
+        return self.tree[1]
+
+    def update(self, idx, priorities):
+        """Set the priorities of the given slots and refresh their ancestors"""
+        pos = np.asarray(idx) + self.leaves
+        self.tree[pos] = priorities
+        for _ in range(self.depth):
+            pos = np.unique(pos // 2)
+            self.tree[pos] = self.tree[2 * pos] + self.tree[2 * pos + 1]
+
+    def find(self, values):
+        """Slots whose cumulative priority range contains each value"""
+        values = np.array(values, dtype=np.float64)
+        pos = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * pos
+            go_right = values > self.tree[left]
+            values -= np.where(go_right, self.tree[left], 0.0)
+            pos = left + go_right
+        return pos - self.leaves
+
+
+class PrioritizedReplayMemory(ReplayMemory):
+    """
+    Replay memory that samples transitions in proportion to their TD error
+
+    Priorities are (|TD error| + eps) ** alpha and live in a SumTree.
+    New transitions get the highest priority seen so far, so each one is
+    replayed at least once before its error is known. Importance-sampling
+    weights correct for the skew; beta anneals towards 1.
+    """
+
+    def __init__(self, capacity, state_size=11, action_size=3, seed=None,
+                 alpha=0.6, beta=0.4, beta_increment=0.001, eps=1e-3):
+        super().__init__(capacity, state_size, action_size, seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+
+    def append(self, state, action, reward, next_state, done):
+        """Store one transition with the current maximum priority"""
+        i = self.position
+        super().append(state, action, reward, next_state, done)
+        self.tree.update([i], [self.max_priority])
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        """Store a batch of transitions with the current maximum priority"""
+        idx = super().extend(states, actions, rewards, next_states, dones)
+        self.tree.update(idx, np.full(len(idx), self.max_priority))
+        return idx
+
+    def clear(self):
+        """Forget every stored transition and its priority"""
+        super().clear()
+        self.tree.tree[:] = 0.0
+
+    def snapshot(self):
+        """Copy of the stored transitions and their priorities, oldest first"""
+        snapshot = super().snapshot()
+        idx = (self.position - self.size + np.arange(self.size)) % self.capacity
+        snapshot['priorities'] = self.tree.tree[idx + self.tree.leaves]
+        snapshot['max_priority'] = np.float64(self.max_priority)
+        snapshot['beta'] = np.float64(self.beta)
+        return snapshot
+
+    def restore(self, snapshot):
+        """Replace the contents with a snapshot, keeping saved priorities"""
+        idx = super().restore(snapshot)
+        if 'priorities' in snapshot:
+            self.tree.update(idx, np.asarray(snapshot['priorities'])[-len(idx):])
+            self.max_priority = float(snapshot['max_priority'])
+            self.beta = float(snapshot['beta'])
+        return idx
+
+    def sample_prioritized(self, batch_size):
+        """
+        Draw a batch of transitions by priority, one per equal slice of
+        the total priority mass
+        Returns:
+            batch: the (states, actions, rewards, next_states, dones) tuple
+            idx: (B,) buffer indices, for update_priorities
+            weights: (B,) float32 importance-sampling weights, max 1
+        """
+        n = min(batch_size, self.size)
+        total = self.tree.total
+        values = (np.arange(n) + self.rng.random(n)) * (total / n)
+        idx = np.minimum(self.tree.find(values), self.size - 1)
+
+        probs = self.tree.tree[idx + self.tree.leaves] / total
+        weights = (self.size * probs) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return self.batch(idx), idx, weights.astype(np.float32)
+
+    def update_priorities(self, idx, td_errors):
+        """Set new priorities from the TD errors of a trained batch"""
+        priorities = (np.abs(td_errors) + self.eps) ** self.alpha
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities)
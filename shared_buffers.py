@@ -0,0 +1,187 @@
+"""
+Shared-memory buffers for moving weights, transitions and observations
+between processes
+
+Everything lives in multiprocessing RawArrays, so it works with any start
+method and on the Python 3.6 images we ship for the Jetson. Each buffer
+keeps the raw arrays only and rebuilds its NumPy views after being sent
+to a child process.
+"""
+import ctypes
+import multiprocessing as mp
+import time
+import numpy as np
+import torch
+from torch.nn.utils import parameters_to_vector
+from observation import NUM_STATES, STATE_SIZE
+
+
+def shared_array(shape, dtype, ctx=mp):
+    """Zeroed RawArray big enough for an array of the given shape and dtype"""
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return ctx.RawArray(ctypes.c_byte, max(nbytes, 1))
+
+
+def as_numpy(raw, shape, dtype):
+    """NumPy view of a RawArray, sharing its memory"""
+    count = int(np.prod(shape))
+    return np.frombuffer(raw, dtype=dtype, count=count).reshape(shape)
+
+
+class SharedArrays:
+    """
+    Named NumPy arrays backed by RawArrays
+
+    Picklable for a child process: only the raw buffers travel, and the
+    views are rebuilt on first use in each process.
+    """
+
+    def __init__(self, layout, ctx=mp):
+        """
+        Args:
+            layout: dict of name -> (shape, dtype)
+        """
+        self.layout = layout
+        self._raw = {name: shared_array(shape, dtype, ctx) for name, (shape, dtype) in layout.items()}
+        self._views = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_views'] = None
+        return state
+
+    def __getitem__(self, name):
+        if self._views is None:
+            self._views = {name: as_numpy(self._raw[name], shape, dtype)
+                           for name, (shape, dtype) in self.layout.items()}
+        return self._views[name]
+
+
+class SharedWeights:
+    """
+    Flat float32 copy of a model's parameters in shared memory
+
+    The learner publishes its weights with publish(). Actors attach() a
+    CPU model of the same architecture, whose parameters then become views
+    of the shared buffer, so a broadcast never copies into each actor.
+    A lock keeps a publish from overlapping an actor's read, and a version
+    counter tells actors when there is something new to read.
+    """
+
+    def __init__(self, model, ctx=mp):
+        self.size = sum(p.numel() for p in model.parameters())
+        self._raw = shared_array((self.size,), np.float32, ctx)
+        self._version = ctx.RawValue(ctypes.c_longlong, 0)
+        self._lock = ctx.Lock()
+        self.publish(model)
+
+    @property
+    def version(self):
+        """Number of publishes so far"""
+        return self._version.value
+
+    def _tensor(self):
+        return torch.from_numpy(as_numpy(self._raw, (self.size,), np.float32))
+
+    def publish(self, model):
+        """Copy the model's current parameters into the shared buffer"""
+        with torch.no_grad():
+            vector = parameters_to_vector(model.parameters()).detach().cpu()
+        with self._lock:
+            self._tensor().copy_(vector)
+            self._version.value += 1
+
+    def attach(self, model):
+        """Point every parameter of a CPU model at its slice of the buffer"""
+        flat = self._tensor()
+        offset = 0
+        for param in model.parameters():
+            n = param.numel()
+            param.data = flat[offset:offset + n].view_as(param)
+            offset += n
+        return model
+
+    def sync(self, cache):
+        """
+        Refill a QValueCache over an attached model from the latest weights
+        Returns:
+            the version that was read
+        """
+        with self._lock:
+            version = self._version.value
+            cache.invalidate()
+            cache.refresh(np.arange(NUM_STATES))
+        return version
+
+
+class TransitionRing:
+    """
+    Single-producer, single-consumer ring of transitions in shared memory
+
+    One actor push()es transitions and the learner drain()s them. The
+    write and read counters only ever grow; a slot is index % capacity.
+    When the ring is full the actor waits for the learner, so no
+    transition is dropped or overwritten before it is read.
+    """
+
+    def __init__(self, capacity, ctx=mp):
+        self.capacity = capacity
+        self.arrays = SharedArrays({
+            'states': ((capacity, STATE_SIZE), np.uint8),
+            'actions': ((capacity,), np.int8),
+            'rewards': ((capacity,), np.float32),
+            'next_states': ((capacity, STATE_SIZE), np.uint8),
+            'dones': ((capacity,), np.bool_),
+        }, ctx)
+        # Synchronized counters: their locks order the array writes
+        self._written = ctx.Value(ctypes.c_longlong, 0)
+        self._read = ctx.Value(ctypes.c_longlong, 0)
+
+    def __len__(self):
+        return self._written.value - self._read.value
+
+    def push(self, states, actions, rewards, next_states, dones, stop=None):
+        """
+        Append a batch of transitions, waiting while the ring is full
+        Args:
+            actions: (n,) action indices
+            stop: optional Event that abandons the wait when set
+        Returns:
+            False if the wait was abandoned and nothing was written
+        """
+        n = len(rewards)
+        written = self._written.value
+        while written + n - self._read.value > self.capacity:
+            if stop is not None and stop.is_set():
+                return False
+            time.sleep(0.001)
+
+        slots = (written + np.arange(n)) % self.capacity
+        arrays = self.arrays
+        arrays['states'][slots] = states
+        arrays['actions'][slots] = actions
+        arrays['rewards'][slots] = rewards
+        arrays['next_states'][slots] = next_states
+        arrays['dones'][slots] = dones
+        with self._written.get_lock():
+            self._written.value = written + n
+        return True
+
+    def drain(self):
+        """
+        Take every transition written since the last drain
+        Returns:
+            (states, actions, rewards, next_states, dones) copies, or None
+            if the ring is empty
+        """
+        start = self._read.value
+        end = self._written.value
+        if end == start:
+            return None
+        slots = np.arange(start, end) % self.capacity
+        arrays = self.arrays
+        batch = tuple(arrays[name][slots] for name in
+                      ('states', 'actions', 'rewards', 'next_states', 'dones'))
+        with self._read.get_lock():
+            self._read.value = end
+        return batch
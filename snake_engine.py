@@ -0,0 +1,390 @@
+"""
+Headless Snake simulation core
+
+Holds the snake, food, direction and collision rules without importing
+pygame, so it can be stepped as fast as the CPU allows. The pygame games
+in snake_game.py are thin renderers on top of this class.
+"""
+import random
+import numpy as np
+from enum import Enum
+from collections import namedtuple, deque
+from collections.abc import Sequence
+
+class Direction(Enum):
+    RIGHT = 1
+    LEFT = 2
+    UP = 3
+    DOWN = 4
+
+Point = namedtuple('Point', 'x, y')
+
+BLOCK_SIZE = 20
+
+# Integer direction codes in clockwise order, so a right turn is +1
+CLOCK_WISE = (Direction.RIGHT, Direction.DOWN, Direction.LEFT, Direction.UP)
+DIRECTION_CODE = {direction: code for code, direction in enumerate(CLOCK_WISE)}
+# (dx, dy) cell step for each direction code
+DIRECTION_DELTA = ((1, 0), (0, 1), (-1, 0), (0, -1))
+# Direction code offset for each action index [straight, right, left]
+TURN_OFFSET = (0, 1, 3)
+# TURN_TABLE[code][action] -> new direction code
+TURN_TABLE = tuple(tuple((code + offset) % 4 for offset in TURN_OFFSET) for code in range(4))
+
+
+def action_index(action):
+    """
+    Index of an action in [straight, right, left]
+    Args:
+        action: an index, or a one-hot list or numpy array
+    """
+    if isinstance(action, (int, np.integer)):
+        return int(action)
+    if action[0]:
+        return 0
+    if action[1]:
+        return 1
+    return 2
+
+
+def spawn_seeds(seed, n):
+    """
+    Independent integer seeds for n games, agents or worker processes
+    Args:
+        seed: root seed, or None for fresh OS entropy
+    Returns:
+        list of n ints; the same root seed always gives the same list
+    """
+    children = np.random.SeedSequence(seed).spawn(n)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+class SnakeBody(Sequence):
+    """
+    Read-only view of a snake body as pixel Points, head first
+    """
+
+    __slots__ = ('_cells',)
+
+    def __init__(self, cells):
+        self._cells = cells
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [Point(x*BLOCK_SIZE, y*BLOCK_SIZE) for x, y in list(self._cells)[i]]
+        x, y = self._cells[i]
+        return Point(x*BLOCK_SIZE, y*BLOCK_SIZE)
+
+    def __iter__(self):
+        for x, y in self._cells:
+            yield Point(x*BLOCK_SIZE, y*BLOCK_SIZE)
+
+    def __repr__(self):
+        return 'SnakeBody({})'.format(list(self))
+
+
+class SnakeEngine:
+    """
+    Pure-logic Snake game: no display, no event loop, no frame throttling
+    """
+
+    def __init__(self, w=640, h=480, seed=None):
+        self.w = w
+        self.h = h
+        self.cols = w // BLOCK_SIZE
+        self.rows = h // BLOCK_SIZE
+        # Private stream for food placement: equal seeds replay equal games
+        self.rng = random.Random(seed)
+        # Bumped on every change to the snake, so get_state can be cached
+        self._frame = 0
+        self._cached_state = (None, None)
+        self.reset()
+        self.high_score = 0
+
+    def reset(self):
+        """Reset the game to initial state"""
+        # Init game state
+        self._frame += 1
+        self._dir = DIRECTION_CODE[Direction.RIGHT]
+
+        x = self.cols // 2
+        y = self.rows // 2
+        self._head = (x, y)
+        self._body = deque([(x, y), (x-1, y), (x-2, y)])
+        self._build_occupancy()
+
+        self.score = 0
+        self.won = False
+        self.food = None
+        self._place_food()
+        self.frame_iteration = 0
+
+    @property
+    def head(self):
+        """Head position in pixels"""
+        return Point(self._head[0]*BLOCK_SIZE, self._head[1]*BLOCK_SIZE)
+
+    @property
+    def direction(self):
+        """Current Direction of travel"""
+        return CLOCK_WISE[self._dir]
+
+    @direction.setter
+    def direction(self, direction):
+        self._frame += 1
+        self._dir = DIRECTION_CODE[direction]
+
+    @property
+    def snake(self):
+        """Read-only body in pixels, head first"""
+        return SnakeBody(self._body)
+
+    def set_body(self, points):
+        """
+        Replace the whole snake body
+        Args:
+            points: in-bounds pixel Points, head first
+        """
+        self._body = deque((int(pt.x) // BLOCK_SIZE, int(pt.y) // BLOCK_SIZE) for pt in points)
+        self._head = self._body[0]
+        self._build_occupancy()
+        self._frame += 1
+
+    def _cell(self, pt):
+        """Index of the grid cell containing an in-bounds point"""
+        return int(pt.y) // BLOCK_SIZE * self.cols + int(pt.x) // BLOCK_SIZE
+
+    def _build_occupancy(self):
+        """
+        Rebuild the per-cell count of body segments and the free-cell index
+
+        Both are kept in step with the body by _advance, so self-collision
+        is one lookup and food placement one random pick whatever the
+        snake length.
+        """
+        self._occupancy = bytearray(self.cols * self.rows)
+        for x, y in self._body:
+            self._occupancy[y * self.cols + x] += 1
+        # Free cells in any order, plus each cell's position in that list
+        self._free = [cell for cell in range(self.cols * self.rows) if not self._occupancy[cell]]
+        self._free_pos = [-1] * (self.cols * self.rows)
+        for pos, cell in enumerate(self._free):
+            self._free_pos[cell] = pos
+
+    def _occupy(self, cell):
+        """Add a body segment to a cell"""
+        self._occupancy[cell] += 1
+        if self._occupancy[cell] == 1:
+            # Swap-remove the cell from the free list
+            pos = self._free_pos[cell]
+            last = self._free.pop()
+            if last != cell:
+                self._free[pos] = last
+                self._free_pos[last] = pos
+            self._free_pos[cell] = -1
+
+    def _vacate(self, cell):
+        """Remove a body segment from a cell"""
+        self._occupancy[cell] -= 1
+        if self._occupancy[cell] == 0:
+            self._free_pos[cell] = len(self._free)
+            self._free.append(cell)
+
+    def _place_food(self):
+        """
+        Place food on a uniformly random free cell
+        Returns:
+            False if the snake fills the board and no cell is left,
+            in which case the food stays where it was eaten
+        """
+        if not self._free:
+            return False
+        cell = self._free[self.rng.randrange(len(self._free))]
+        self.food = Point(cell % self.cols * BLOCK_SIZE, cell // self.cols * BLOCK_SIZE)
+        return True
+
+    def play_step(self, action):
+        """
+        Execute one game step with a relative action
+        Args:
+            action: [straight, right, left] - one-hot encoded action (list
+                or numpy array) or the index of the action
+        Returns:
+            reward: reward for the action
+            game_over: boolean indicating if game is over
+            score: current score
+        """
+        self.frame_iteration += 1
+        self._move(action)  # Update the head
+        return self._advance(timeout=True)
+
+    def play_step_direction(self, direction):
+        """
+        Execute one game step with an absolute direction (human controls)
+        Args:
+            direction: Direction to move in
+        Returns:
+            reward: reward for the move
+            game_over: boolean indicating if game is over
+            score: current score
+        """
+        self.frame_iteration += 1
+        self.direction = direction
+        self._move_head()
+        return self._advance(timeout=False)
+
+    def step(self, action):
+        """
+        Execute one game step and observe the result
+        Args:
+            action: [straight, right, left] - one-hot encoded action (list
+                or numpy array) or the index of the action
+        Returns:
+            obs: state after the step (see get_state), cached for this frame
+            reward: reward for the action
+            done: boolean indicating if game is over
+            info: dict with 'score' and 'won'
+        """
+        reward, done, score = self.play_step(action)
+        return self.get_state(), reward, done, {'score': score, 'won': self.won}
+
+    def _advance(self, timeout):
+        """
+        Grow the body onto the new head, then either end the game,
+        eat the food or drop the tail
+        """
+        self._frame += 1
+        x, y = self._head
+        self._body.appendleft(self._head)
+        inside = 0 <= x < self.cols and 0 <= y < self.rows
+        if inside:
+            cell = y * self.cols + x
+            self._occupy(cell)
+
+        # Check if game over (a count above one means the head hit the body)
+        reward = 0
+        game_over = False
+        if (not inside or self._occupancy[cell] > 1 or
+                (timeout and self.frame_iteration > 100*len(self._body))):
+            game_over = True
+            reward = -10
+            return reward, game_over, self.score
+
+        # Place new food or just move
+        if self.food.x == x*BLOCK_SIZE and self.food.y == y*BLOCK_SIZE:
+            self.score += 1
+            reward = 10
+            if not self._place_food():
+                # Board full: the snake has won
+                self.won = True
+                game_over = True
+        else:
+            x, y = self._body.pop()
+            if 0 <= x < self.cols and 0 <= y < self.rows:
+                self._vacate(y * self.cols + x)
+
+        return reward, game_over, self.score
+
+    def is_collision(self, pt=None):
+        """Check if there's a collision with walls or self"""
+        if pt is None:
+            pt = self.head
+        # Hits boundary
+        if self._out_of_bounds(pt):
+            return True
+        # Hits itself (the head's own segment does not count)
+        count = self._occupancy[self._cell(pt)]
+        if pt == self.head:
+            count -= 1
+        return count > 0
+
+    def _out_of_bounds(self, pt):
+        """Check if a point lies outside the board"""
+        return pt.x > self.w - BLOCK_SIZE or pt.x < 0 or pt.y > self.h - BLOCK_SIZE or pt.y < 0
+
+    def _move(self, action):
+        """
+        Move the snake based on action
+        Args:
+            action: [straight, right, left] one-hot list or array, or its index
+        """
+        self._dir = TURN_TABLE[self._dir][action_index(action)]
+        self._move_head()
+
+    def _move_head(self):
+        """Move the head one cell in the current direction"""
+        dx, dy = DIRECTION_DELTA[self._dir]
+        self._head = (self._head[0] + dx, self._head[1] + dy)
+
+    def get_state(self):
+        """
+        Get current game state for RL agent
+
+        The result is cached until the snake or food changes, so calling
+        this again on the same frame (e.g. after step) costs nothing.
+        The returned array must not be modified.
+        Returns:
+            numpy array with 11 values representing the state
+        """
+        key = (self._frame, self.food)
+        if self._cached_state[0] == key:
+            return self._cached_state[1]
+        state = self._compute_state()
+        self._cached_state = (key, state)
+        return state
+
+    def _compute_state(self):
+        """Build the 11-value state vector for the current frame"""
+        head = self.head
+        point_l = Point(head.x - BLOCK_SIZE, head.y)
+        point_r = Point(head.x + BLOCK_SIZE, head.y)
+        point_u = Point(head.x, head.y - BLOCK_SIZE)
+        point_d = Point(head.x, head.y + BLOCK_SIZE)
+
+        direction = self.direction
+        dir_l = direction == Direction.LEFT
+        dir_r = direction == Direction.RIGHT
+        dir_u = direction == Direction.UP
+        dir_d = direction == Direction.DOWN
+
+        state = [
+            # Danger straight
+            (dir_r and self.is_collision(point_r)) or
+            (dir_l and self.is_collision(point_l)) or
+            (dir_u and self.is_collision(point_u)) or
+            (dir_d and self.is_collision(point_d)),
+
+            # Danger right
+            (dir_u and self.is_collision(point_r)) or
+            (dir_d and self.is_collision(point_l)) or
+            (dir_l and self.is_collision(point_u)) or
+            (dir_r and self.is_collision(point_d)),
+
+            # Danger left
+            (dir_d and self.is_collision(point_r)) or
+            (dir_u and self.is_collision(point_l)) or
+            (dir_r and self.is_collision(point_u)) or
+            (dir_l and self.is_collision(point_d)),
+
+            # Move direction
+            dir_l,
+            dir_r,
+            dir_u,
+            dir_d,
+
+            # Food location
+            self.food.x < head.x,  # food left
+            self.food.x > head.x,  # food right
+            self.food.y < head.y,  # food up
+            self.food.y > head.y   # food down
+        ]
+
+        return np.array(state, dtype=int)
+
+    def update_high_score(self):
+        """Update high score if current score is higher"""
+        if self.score > self.high_score:
+            self.high_score = self.score
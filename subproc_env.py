@@ -0,0 +1,199 @@
+"""
+Snake games stepped by a pool of worker processes
+
+Each worker owns a contiguous block of headless SnakeGameAI games. Actions,
+observations, rewards, dones and scores live in shared memory; the pipes
+to the workers only carry one-word commands, so no array is ever pickled.
+
+Usage (throughput against the single-process demo.py loop):
+    python subproc_env.py --workers 4 --envs-per-worker 16
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Workers never open a window
+
+import argparse
+import multiprocessing as mp
+import time
+import numpy as np
+from observation import STATE_SIZE, ObservationBuilder, get_states
+from shared_buffers import SharedArrays
+from snake_engine import spawn_seeds
+from snake_game import SnakeGameAI
+
+
+def _worker(conn, arrays, start, count, w, h, seed):
+    """Serve step/reset commands for games start .. start + count - 1"""
+    games = [SnakeGameAI(w, h, render=False, seed=s) for s in spawn_seeds(seed, count)]
+    end = start + count
+    actions = arrays['actions'][start:end]
+    rewards = arrays['rewards'][start:end]
+    dones = arrays['dones'][start:end]
+    scores = arrays['scores'][start:end]
+    builder = ObservationBuilder(count)
+    # Observations are built straight into this worker's shared rows
+    builder.out = arrays['states'][start:end]
+    get_states(games, builder)
+    conn.send('ready')
+
+    while True:
+        command = conn.recv()
+        if command == 'step':
+            for i, game in enumerate(games):
+                rewards[i], dones[i], scores[i] = game.play_step(int(actions[i]))
+                if dones[i]:
+                    game.reset()
+        elif command == 'reset':
+            for game in games:
+                game.reset()
+        elif command == 'close':
+            break
+        get_states(games, builder)
+        conn.send(command)
+    conn.close()
+
+
+class SubprocSnakeEnv:
+    """
+    num_workers processes stepping envs_per_worker games each
+
+    Same interface as VectorSnakeEnv (play_step, get_state, auto-reset of
+    finished games), plus step_async/step_wait so the caller can run
+    inference or training while the workers step. Every worker spawns
+    its game seeds from its own child of seed.
+    """
+
+    def __init__(self, num_workers, envs_per_worker, w=640, h=480, seed=None):
+        self.num_workers = num_workers
+        self.num_envs = num_workers * envs_per_worker
+        # spawn: workers must not inherit the parent's CUDA or OpenMP state
+        ctx = mp.get_context('spawn')
+        n = self.num_envs
+        self.arrays = SharedArrays({
+            'actions': ((n,), np.int8),
+            'states': ((n, STATE_SIZE), np.uint8),
+            'rewards': ((n,), np.float32),
+            'dones': ((n,), np.bool_),
+            'scores': ((n,), np.int32),
+        }, ctx)
+        self._conns = []
+        self._workers = []
+        for k, worker_seed in enumerate(spawn_seeds(seed, num_workers)):
+            parent, child = ctx.Pipe()
+            worker = ctx.Process(target=_worker, daemon=True,
+                                 args=(child, self.arrays, k * envs_per_worker,
+                                       envs_per_worker, w, h, worker_seed))
+            worker.start()
+            child.close()
+            self._conns.append(parent)
+            self._workers.append(worker)
+        self._wait()
+        self._waiting = False
+        self.closed = False
+
+    def _send(self, command):
+        for conn in self._conns:
+            conn.send(command)
+
+    def _wait(self):
+        for conn in self._conns:
+            conn.recv()
+
+    def reset(self):
+        """Reset every game"""
+        self._send('reset')
+        self._wait()
+
+    def step_async(self, actions):
+        """
+        Start one step in every game and return immediately
+        Args:
+            actions: (N, 3) one-hot [straight, right, left] actions or (N,) indices
+        """
+        actions = np.asarray(actions)
+        if actions.ndim == 2:
+            actions = actions.argmax(axis=1)
+        self.arrays['actions'][:] = actions
+        self._send('step')
+        self._waiting = True
+
+    def step_wait(self):
+        """
+        Wait for the step started by step_async
+        Returns:
+            rewards: (N,) rewards for the actions
+            dones: (N,) booleans, True for games that ended (and were reset)
+            scores: (N,) scores, the final score for games that ended
+        """
+        self._wait()
+        self._waiting = False
+        return (self.arrays['rewards'].copy(), self.arrays['dones'].copy(),
+                self.arrays['scores'].copy())
+
+    def play_step(self, actions):
+        """Execute one step in every game, see step_wait for the returns"""
+        self.step_async(actions)
+        return self.step_wait()
+
+    def get_state(self):
+        """
+        Get the current state of every game for RL agents
+        Returns:
+            (N, 11) uint8 array in shared memory, overwritten by the next step
+        """
+        return self.arrays['states']
+
+    def close(self):
+        """Stop the workers"""
+        if self.closed:
+            return
+        if self._waiting:
+            self._wait()
+        self._send('close')
+        for worker in self._workers:
+            worker.join()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(num_workers, envs_per_worker, steps=2000, w=640, h=480):
+    """
+    Random-action throughput of the pool and of the demo.py loop
+    Returns:
+        (pool steps/sec, single-process steps/sec)
+    """
+    rng = np.random.default_rng(0)
+    with SubprocSnakeEnv(num_workers, envs_per_worker, w, h, seed=0) as env:
+        actions = rng.integers(0, 3, (steps, env.num_envs))
+        start = time.perf_counter()
+        for t in range(steps):
+            env.get_state()
+            env.play_step(actions[t])
+        pool = steps * env.num_envs / (time.perf_counter() - start)
+
+    # demo.py: one game, get_state and step per frame
+    game = SnakeGameAI(w, h, render=False, seed=0)
+    actions = rng.integers(0, 3, steps * 10)
+    start = time.perf_counter()
+    for action in actions:
+        game.get_state()
+        if game.step(int(action))[2]:
+            game.reset()
+    single = len(actions) / (time.perf_counter() - start)
+    return pool, single
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Subprocess Snake env throughput')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--envs-per-worker', type=int, default=16)
+    parser.add_argument('--steps', type=int, default=2000)
+    args = parser.parse_args()
+    pool, single = benchmark(args.workers, args.envs_per_worker, args.steps)
+    print(f"SubprocSnakeEnv ({args.workers}x{args.envs_per_worker}): {pool:,.0f} steps/s")
+    print(f"Single process (demo.py loop): {single:,.0f} steps/s")
+    print(f"Speedup: {pool / single:.2f}x")
@@ -0,0 +1,159 @@
+"""
+Tabular Q-Learning Agent for Snake Game
+
+The 11 binary state features give at most 2048 states, so the whole
+Q-function fits in a NumPy table. Same interface as agent.Agent, but no
+torch: useful for fast baselines and parameter sweeps on CPU.
+"""
+import numpy as np
+import os
+from observation import NUM_STATES, pack_states
+from replay_memory import ReplayMemory, PrioritizedReplayMemory, MAX_MEMORY, BATCH_SIZE, SHORT_BATCH
+from snake_engine import spawn_seeds
+from checkpoint import atomic_write
+
+LR = 0.1
+
+
+class TabularAgent:
+    """
+    Reinforcement Learning Agent using a Q-table
+    """
+
+    def __init__(self, prioritized=False, short_batch=SHORT_BATCH, seed=None,
+                 max_memory=MAX_MEMORY, batch_size=BATCH_SIZE, lr=LR, gamma=0.9):
+        self.n_games = 0
+        self.epsilon = 0  # Randomness
+        self.gamma = gamma  # Discount rate
+        self.lr = lr  # Step size of each Q-table update
+        self.batch_size = batch_size
+        self.prioritized = prioritized
+        # Separate streams for exploration and replay sampling
+        action_seed, memory_seed = spawn_seeds(seed, 2)
+        if prioritized:
+            self.memory = PrioritizedReplayMemory(max_memory, seed=memory_seed)
+        else:
+            self.memory = ReplayMemory(max_memory, seed=memory_seed)
+        self.q_table = np.zeros((NUM_STATES, 3), dtype=np.float32)
+        self.rng = np.random.default_rng(action_seed)
+        # Short-memory transitions waiting for a batched update
+        self.short_batch = short_batch
+        self.short_memory = ReplayMemory(short_batch)
+
+    def get_state(self, game):
+        """Get the current game state"""
+        return game.get_state()
+
+    def remember(self, state, action, reward, next_state, done):
+        """Store experience in memory"""
+        self.memory.append(state, action, reward, next_state, done)
+
+    def update(self, states, actions, rewards, next_states, dones, weights=None):
+        """
+        Q-learning update on a batch of transitions
+        Args:
+            states, next_states: (n, 11) states
+            actions: (n, 3) one-hot actions
+            rewards, dones: (n,) arrays
+            weights: optional (n,) importance-sampling weights
+        Returns:
+            (n,) TD errors before the update
+        """
+        s = pack_states(states)
+        s_next = pack_states(next_states)
+        a = np.argmax(actions, axis=1)
+        rewards = np.asarray(rewards, dtype=np.float32)
+        dones = np.asarray(dones, dtype=np.bool_)
+
+        # Q_new = r + y * max(Q[s']) -> only if not done
+        q_new = np.where(dones, rewards, rewards + self.gamma * self.q_table[s_next].max(axis=1))
+        td_errors = q_new - self.q_table[s, a]
+        step = self.lr * td_errors
+        if weights is not None:
+            step *= weights
+        # add.at so repeated (state, action) pairs all contribute
+        np.add.at(self.q_table, (s, a), step)
+        return td_errors
+
+    def train_long_memory(self):
+        """Train on a batch of experiences from memory"""
+        if self.prioritized:
+            batch, idx, weights = self.memory.sample_prioritized(self.batch_size)
+            td_errors = self.update(*batch, weights=weights)
+            self.memory.update_priorities(idx, td_errors)
+        else:
+            self.update(*self.memory.sample(self.batch_size))
+
+    def train_short_memory(self, state, action, reward, next_state, done):
+        """
+        Train on a single experience
+
+        With short_batch=K > 1 the experience is queued instead, and the
+        last K experiences are applied together (sooner when a game ends).
+        """
+        if self.short_batch == 1:
+            self.update([state], [action], [reward], [next_state], [done])
+            return
+        self.short_memory.append(state, action, reward, next_state, done)
+        if done or len(self.short_memory) == self.short_batch:
+            self.flush_short_memory()
+
+    def flush_short_memory(self):
+        """Train on the queued short-memory experiences, if any"""
+        if len(self.short_memory) == 0:
+            return
+        self.update(*self.short_memory.batch(np.arange(len(self.short_memory))))
+        self.short_memory.clear()
+
+    def get_action(self, state):
+        """
+        Get action based on current state
+        Uses epsilon-greedy strategy for exploration vs exploitation
+        """
+        # Random moves: tradeoff exploration / exploitation
+        self.epsilon = 80 - self.n_games
+        final_move = [0, 0, 0]
+        if self.rng.integers(0, 201) < self.epsilon:
+            move = int(self.rng.integers(0, 3))
+        else:
+            move = int(np.argmax(self.q_table[pack_states(state)]))
+        final_move[move] = 1
+
+        return final_move
+
+    def get_action_batch(self, states, one_hot=True):
+        """
+        Epsilon-greedy actions for many games at once
+        Args:
+            states: (n, 11) states
+            one_hot: return (n, 3) one-hot actions instead of (n,) indices
+        Returns:
+            numpy array of actions
+        """
+        self.epsilon = 80 - self.n_games
+        moves = np.argmax(self.q_table[pack_states(states)], axis=1)
+        explore = self.rng.integers(0, 201, len(moves)) < self.epsilon
+        moves = np.where(explore, self.rng.integers(0, 3, len(moves)), moves)
+        if one_hot:
+            return np.eye(3, dtype=np.int8)[moves]
+        return moves
+
+    def save_model(self, filename='q_table.npz'):
+        """Save the current Q-table"""
+        model_folder_path = './model'
+        if not os.path.exists(model_folder_path):
+            os.makedirs(model_folder_path)
+
+        atomic_write(os.path.join(model_folder_path, filename),
+                     lambda f: np.savez(f, q_table=self.q_table, n_games=self.n_games))
+
+    def load_model(self, filename='q_table.npz'):
+        """Load a saved Q-table"""
+        model_path = f'./model/{filename}'
+        if os.path.exists(model_path):
+            with np.load(model_path) as checkpoint:
+                self.q_table = checkpoint['q_table'].astype(np.float32)
+                self.n_games = int(checkpoint['n_games'])
+            print(f"Model loaded from {model_path}")
+        else:
+            print(f"No model found at {model_path}")
@@ -0,0 +1,827 @@
+"""
+Unit tests for the RL agent components
+"""
+import unittest
+import sys
+import os
+import copy
+import tempfile
+import numpy as np
+import torch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from replay_memory import ReplayMemory, PrioritizedReplayMemory, SumTree
+from model import Linear_QNet, QTrainer, QValueCache, quantize_model, quantization_report
+from observation import pack_states, unpack_states
+from tabular_agent import TabularAgent
+from numpy_policy import export_npz, load_npz, NumpyQNet
+from shared_buffers import SharedWeights, TransitionRing
+
+
+class TestReplayMemory(unittest.TestCase):
+    """Test cases for the replay memory ring buffer"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.memory = ReplayMemory(5, seed=0)
+    
+    def remember(self, i):
+        """Store a transition tagged with i"""
+        state = np.full(11, i % 2, dtype=int)
+        action = [0, 0, 0]
+        action[i % 3] = 1
+        self.memory.append(state, action, float(i), 1 - state, i % 4 == 0)
+    
+    def test_append_and_sample_all(self):
+        """Test a small memory returns every transition in order"""
+        for i in range(3):
+            self.remember(i)
+        
+        states, actions, rewards, next_states, dones = self.memory.sample(10)
+        self.assertEqual(len(self.memory), 3)
+        self.assertEqual(states.dtype, np.uint8)
+        np.testing.assert_array_equal(rewards, [0.0, 1.0, 2.0])
+        np.testing.assert_array_equal(actions, [[1, 0, 0], [0, 1, 0], [0, 0, 1]])
+        np.testing.assert_array_equal(next_states, 1 - states)
+        np.testing.assert_array_equal(dones, [True, False, False])
+    
+    def test_overwrites_oldest(self):
+        """Test the ring buffer keeps only the newest transitions"""
+        for i in range(8):
+            self.remember(i)
+        
+        self.assertEqual(len(self.memory), 5)
+        rewards = self.memory.sample(10)[2]
+        self.assertEqual(sorted(rewards), [3.0, 4.0, 5.0, 6.0, 7.0])
+    
+    def test_sample_distinct(self):
+        """Test sampled batches hold distinct transitions"""
+        memory = ReplayMemory(100, seed=0)
+        for i in range(100):
+            memory.append(np.zeros(11), 0, float(i), np.zeros(11), False)
+        
+        rewards = memory.sample(30)[2]
+        self.assertEqual(len(rewards), 30)
+        self.assertEqual(len(set(rewards)), 30)
+    
+    def test_extend_matches_append(self):
+        """Test batched writes wrap like repeated appends"""
+        for i in range(8):
+            self.remember(i)
+        i = np.arange(8)
+        states = np.repeat((i % 2)[:, None], 11, axis=1)
+        batch = (states, i % 3, i.astype(float), 1 - states, i % 4 == 0)
+        
+        other = ReplayMemory(5, seed=0)
+        other.extend(*(x[:3] for x in batch))
+        other.extend(*(x[3:] for x in batch))
+        self.assertEqual(len(other), 5)
+        self.assertEqual(other.position, self.memory.position)
+        for name in ('states', 'actions', 'rewards', 'next_states', 'dones'):
+            np.testing.assert_array_equal(getattr(other, name), getattr(self.memory, name))
+
+
+class TestPrioritizedReplay(unittest.TestCase):
+    """Test cases for the sum-tree prioritized replay"""
+    
+    def test_sum_tree(self):
+        """Test totals and prefix-sum lookups"""
+        tree = SumTree(5)
+        tree.update(np.arange(5), [1.0, 2.0, 3.0, 4.0, 0.0])
+        self.assertAlmostEqual(tree.total, 10.0)
+        np.testing.assert_array_equal(tree.find([0.5, 1.5, 3.5, 9.9]), [0, 1, 2, 3])
+        
+        tree.update([1], [0.0])
+        self.assertAlmostEqual(tree.total, 8.0)
+        np.testing.assert_array_equal(tree.find([1.5]), [2])
+    
+    def test_samples_by_priority(self):
+        """Test high TD-error transitions are replayed more often"""
+        memory = PrioritizedReplayMemory(100, seed=0)
+        for i in range(100):
+            memory.append(np.zeros(11), 0, float(i), np.zeros(11), False)
+        memory.update_priorities(np.arange(100), np.where(np.arange(100) < 10, 10.0, 0.01))
+        
+        batch, idx, weights = memory.sample_prioritized(50)
+        self.assertGreater(np.mean(idx < 10), 0.5)
+        np.testing.assert_array_equal(batch[2], idx.astype(np.float32))
+        # Over-sampled transitions get the smallest weights
+        self.assertLess(weights[idx < 10].max(), weights[idx >= 10].min())
+        self.assertAlmostEqual(float(weights.max()), 1.0)
+
+
+def reference_train_step(trainer, state, action, reward, next_state, done):
+    """Per-sample Bellman update that QTrainer.train_step vectorizes"""
+    state = torch.tensor(np.array(state), dtype=torch.float)
+    next_state = torch.tensor(np.array(next_state), dtype=torch.float)
+    action = torch.tensor(np.array(action), dtype=torch.long)
+    reward = torch.tensor(np.array(reward), dtype=torch.float)
+    
+    pred = trainer.model(state)
+    target = pred.clone()
+    for idx in range(len(done)):
+        Q_new = reward[idx]
+        if not done[idx]:
+            Q_new = reward[idx] + trainer.gamma * torch.max(trainer.model(next_state[idx]))
+        target[idx][torch.argmax(action[idx]).item()] = Q_new
+    
+    trainer.optimizer.zero_grad()
+    loss = trainer.criterion(target, pred)
+    loss.backward()
+    trainer.optimizer.step()
+
+
+class TestQTrainer(unittest.TestCase):
+    """Test cases for the Q-learning trainer"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        torch.manual_seed(0)
+        rng = np.random.default_rng(0)
+        n = 64
+        self.batch = (rng.integers(0, 2, (n, 11)).astype(np.uint8),
+                      np.eye(3, dtype=np.int8)[rng.integers(0, 3, n)],
+                      rng.choice([-10.0, 0.0, 10.0], n).astype(np.float32),
+                      rng.integers(0, 2, (n, 11)).astype(np.uint8),
+                      rng.random(n) < 0.2)
+        self.model = Linear_QNet(11, 32, 3)
+    
+    def assert_same_update(self, *transition):
+        """Check train_step and the per-sample reference update agree"""
+        trainer = QTrainer(self.model, lr=0.01, gamma=0.9)
+        reference = QTrainer(copy.deepcopy(self.model), lr=0.01, gamma=0.9)
+        
+        trainer.train_step(*transition)
+        if np.ndim(transition[0]) == 1:
+            state, action, reward, next_state, done = transition
+            transition = ([state], [action], [reward], [next_state], [done])
+        reference_train_step(reference, *transition)
+        
+        for p, q in zip(trainer.model.parameters(), reference.model.parameters()):
+            torch.testing.assert_close(p, q)
+    
+    def test_batch_matches_reference(self):
+        """Test the batched update equals the per-sample loop"""
+        self.assert_same_update(*self.batch)
+    
+    def test_unit_weights_match_reference(self):
+        """Test weighted updates with unit weights return TD errors"""
+        trainer = QTrainer(copy.deepcopy(self.model), lr=0.01, gamma=0.9)
+        td_errors = trainer.train_step(*self.batch, weights=np.ones(len(self.batch[0])))
+        self.assertEqual(td_errors.shape, (len(self.batch[0]),))
+        self.assertTrue((td_errors >= 0).all())
+        
+        reference = QTrainer(copy.deepcopy(self.model), lr=0.01, gamma=0.9)
+        reference_train_step(reference, *self.batch)
+        for p, q in zip(trainer.model.parameters(), reference.model.parameters()):
+            torch.testing.assert_close(p, q)
+    
+    def test_single_matches_reference(self):
+        """Test single transitions, terminal and not"""
+        state, action, reward, next_state, done = (b[0] for b in self.batch)
+        self.assert_same_update(state, list(action), float(reward), next_state, False)
+        self.assert_same_update(state, list(action), float(reward), next_state, True)
+
+
+class TestQValueCache(unittest.TestCase):
+    """Test cases for the packed-state Q-value cache"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        torch.manual_seed(0)
+        self.model = Linear_QNet(11, 32, 3)
+        self.states = unpack_states(np.arange(2048))
+    
+    def greedy(self, state):
+        """Uncached greedy action"""
+        with torch.no_grad():
+            return torch.argmax(self.model(torch.tensor(state, dtype=torch.float))).item()
+    
+    def test_pack_round_trip(self):
+        """Test every state packs to its own code"""
+        np.testing.assert_array_equal(pack_states(self.states), np.arange(2048))
+        self.assertEqual(pack_states(self.states[5]), 5)
+    
+    def test_matches_model(self):
+        """Test cached actions equal a forward pass"""
+        cache = QValueCache(self.model)
+        for state in self.states[::7]:
+            self.assertEqual(cache.greedy_action(state), self.greedy(state))
+    
+    def test_batch_matches_model(self):
+        """Test batched lookups equal a forward pass"""
+        cache = QValueCache(self.model)
+        states = self.states[::5]
+        with torch.no_grad():
+            expected = self.model(torch.tensor(states, dtype=torch.float)).argmax(dim=1).numpy()
+        np.testing.assert_array_equal(cache.greedy_actions(states), expected)
+        np.testing.assert_array_equal(cache.greedy_actions(states[::-1]), expected[::-1])
+    
+    def test_refresh_every_k_updates(self):
+        """Test the table only goes stale every refresh_every updates"""
+        cache = QValueCache(self.model, refresh_every=3)
+        cache.greedy_action(self.states[1])
+        before = cache.q_table[1].copy()
+        
+        with torch.no_grad():
+            self.model.linear3.bias += 1.0
+        cache.on_update()
+        cache.on_update()
+        np.testing.assert_array_equal(cache.q_table[1], before)
+        cache.on_update()
+        np.testing.assert_allclose(cache.q_table[1], before + 1.0, rtol=1e-5)
+
+
+class TestAgentBatchActions(unittest.TestCase):
+    """Test cases for batched epsilon-greedy action selection"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        from agent import Agent
+        self.agent = Agent()
+        self.states = unpack_states(np.arange(0, 2048, 3))
+    
+    def test_greedy(self):
+        """Test exploitation matches single-state get_action"""
+        self.agent.n_games = 200
+        actions = self.agent.get_action_batch(self.states)
+        self.assertEqual(actions.shape, (len(self.states), 3))
+        for state, action in zip(self.states[:50], actions):
+            self.assertEqual(self.agent.get_action(state), list(action))
+        
+        moves = self.agent.get_action_batch(self.states, one_hot=False)
+        np.testing.assert_array_equal(moves, actions.argmax(axis=1))
+    
+    def test_exploration(self):
+        """Test early games mix in random moves"""
+        self.agent.n_games = 0
+        greedy = self.agent.q_cache.greedy_actions(self.states)
+        moves = self.agent.get_action_batch(self.states, one_hot=False)
+        # epsilon 80 of 201: about 27% of moves are random and differ
+        self.assertGreater(np.mean(moves != greedy), 0.1)
+
+
+class TestShortBatch(unittest.TestCase):
+    """Test cases for micro-batched short-memory training"""
+    
+    def make_agent(self, k):
+        """Agent with short_batch=k and fixed initial weights"""
+        from agent import Agent
+        torch.manual_seed(0)
+        return Agent(short_batch=k)
+    
+    def transitions(self, n):
+        """n distinct transitions, the last one terminal"""
+        states = unpack_states(np.arange(n) * 37)
+        return [(states[i], np.eye(3)[i % 3], float(i % 5), states[(i + 1) % n], i == n - 1)
+                for i in range(n)]
+    
+    def test_one_update_per_k(self):
+        """Test K queued transitions train as one batched step"""
+        agent = self.make_agent(4)
+        reference = self.make_agent(1)
+        data = self.transitions(4)
+        for t in data[:3]:
+            agent.train_short_memory(*t)
+        self.assertEqual(len(agent.short_memory), 3)
+        self.assertEqual(agent.q_cache._updates, 0)
+        agent.train_short_memory(*data[3])
+        self.assertEqual(len(agent.short_memory), 0)
+        
+        states, actions, rewards, next_states, dones = zip(*data)
+        reference.trainer.train_step(np.array(states), np.array(actions),
+                                     rewards, np.array(next_states), dones)
+        for p, q in zip(agent.model.parameters(), reference.model.parameters()):
+            torch.testing.assert_close(p, q)
+    
+    def test_game_end_flushes(self):
+        """Test a terminal transition trains the partial batch"""
+        agent = self.make_agent(16)
+        for t in self.transitions(5):
+            agent.train_short_memory(*t)
+        self.assertEqual(len(agent.short_memory), 0)
+    
+    def test_k1_is_per_frame(self):
+        """Test K=1 keeps one optimizer step per transition"""
+        agent = self.make_agent(1)
+        reference = self.make_agent(1)
+        for t in self.transitions(3):
+            agent.train_short_memory(*t)
+            reference.trainer.train_step(*t)
+        for p, q in zip(agent.model.parameters(), reference.model.parameters()):
+            torch.testing.assert_close(p, q)
+
+
+class TestSeededAgent(unittest.TestCase):
+    """Test cases for per-instance seeding of agents"""
+    
+    def actions(self, agent):
+        """Actions chosen for a fixed sequence of states"""
+        states = unpack_states(np.arange(200) * 11 % 2048)
+        return [agent.get_action(s) for s in states]
+    
+    def test_agent_seed(self):
+        """Test equal seeds give equal weights and equal actions"""
+        from agent import Agent
+        a, b = Agent(seed=5), Agent(seed=5)
+        for p, q in zip(a.model.parameters(), b.model.parameters()):
+            torch.testing.assert_close(p, q)
+        self.assertEqual(self.actions(a), self.actions(b))
+        self.assertNotEqual(self.actions(Agent(seed=5)), self.actions(Agent(seed=6)))
+    
+    def test_seed_leaves_global_torch_rng(self):
+        """Test seeding an agent does not reseed torch globally"""
+        from agent import Agent
+        torch.manual_seed(0)
+        expected = torch.rand(3)
+        torch.manual_seed(0)
+        Agent(seed=5)
+        torch.testing.assert_close(torch.rand(3), expected)
+    
+    def test_tabular_seed(self):
+        """Test equal seeds give equal tabular actions"""
+        self.assertEqual(self.actions(TabularAgent(seed=5)), self.actions(TabularAgent(seed=5)))
+
+
+class TestTrainHeadless(unittest.TestCase):
+    """Test cases for the budgeted headless trainer"""
+    
+    def test_step_budget(self):
+        """Test training stops exactly at the step budget"""
+        from train import train_headless
+        agent, stats = train_headless(max_steps=300, max_memory=500, batch_size=32,
+                                      seed=0, model_file=None, log_every=1e9)
+        self.assertEqual(stats['steps'], 300)
+        self.assertEqual(stats['stopped_by'], 'max_steps')
+        self.assertEqual(agent.memory.capacity, 500)
+        self.assertEqual(agent.batch_size, 32)
+    
+    def test_prioritized(self):
+        """Test prioritized replay can be switched on for headless runs"""
+        from replay_memory import PrioritizedReplayMemory
+        from train import train_headless
+        agent, stats = train_headless(max_steps=200, batch_size=32, seed=0, model_file=None,
+                                      log_every=1e9, prioritized=True)
+        self.assertIsInstance(agent.memory, PrioritizedReplayMemory)
+    
+    def test_budget_flushes_short_memory(self):
+        """Test transitions queued for micro-batching are trained at the end"""
+        from train import train_headless
+        agent, stats = train_headless(max_steps=7, short_batch=4, seed=0, model_file=None,
+                                      log_every=1e9)
+        self.assertEqual(len(agent.short_memory), 0)
+    
+    def test_target_score(self):
+        """Test a reached target mean score ends the run"""
+        from train import train_headless
+        agent, stats = train_headless(max_steps=100000, target_score=0, score_window=1,
+                                      seed=0, model_file=None, log_every=1e9)
+        self.assertEqual(stats['stopped_by'], 'target_score')
+        self.assertEqual(stats['games'], 1)
+    
+    def test_target_score_ignores_sink_window(self):
+        """Test the target budget uses score_window, not the sink's window"""
+        from metrics import MetricsSink
+        from train import train_headless
+        agent, stats = train_headless(max_steps=100000, target_score=0, score_window=1,
+                                      seed=0, model_file=None, log_every=1e9,
+                                      metrics=MetricsSink(window=50))
+        self.assertEqual(stats['stopped_by'], 'target_score')
+        self.assertEqual(stats['games'], 1)
+    
+    def test_headless_without_pygame(self):
+        """Test the headless trainer never imports pygame"""
+        import subprocess
+        code = "import sys, train; sys.exit('pygame' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code],
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.returncode, 0)
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Test cases for the benchmark helpers"""
+    
+    def test_place_snake(self):
+        """Test a laid-out snake has the requested length and is alive"""
+        from benchmarks.run import place_snake
+        from snake_game import SnakeGameAI
+        game = SnakeGameAI(w=200, h=200, render=False, seed=0)
+        place_snake(game, 25)
+        self.assertEqual(len(game.snake), 25)
+        self.assertFalse(game.is_collision())
+        self.assertNotIn(game.food, game.snake)
+    
+    def test_compare(self):
+        """Test only cases slower than the threshold are flagged"""
+        from benchmarks.run import compare
+        baseline = {'a': {'us_per_call': 10.0}, 'b': {'us_per_call': 10.0},
+                    'gone': {'us_per_call': 1.0}}
+        results = {'a': {'us_per_call': 11.0}, 'b': {'us_per_call': 13.0},
+                   'new': {'us_per_call': 1.0}}
+        rows = compare(results, baseline, threshold=0.2)
+        self.assertEqual([(name, regressed) for name, _, _, _, regressed in rows],
+                         [('a', False), ('b', True)])
+
+
+class TestPhaseProfiler(unittest.TestCase):
+    """Test cases for the training-loop phase profiler"""
+    
+    def test_disabled_is_noop(self):
+        """Test a disabled profiler records nothing"""
+        from profiling import PhaseProfiler
+        profiler = PhaseProfiler()
+        with profiler.phase('env_step'):
+            pass
+        profiler.step()
+        self.assertEqual(profiler.stats(), {})
+    
+    def test_rolling_percentiles(self):
+        """Test only the last window durations feed the percentiles"""
+        from profiling import PhaseProfiler
+        profiler = PhaseProfiler(enabled=True, window=4)
+        for _ in range(10):
+            with profiler.phase('get_action'):
+                pass
+        stats = profiler.stats()['get_action']
+        self.assertEqual(stats['count'], 10)
+        self.assertEqual(len(profiler._rings['get_action'].recent()), 4)
+        self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+        self.assertLessEqual(stats['p95_ms'], stats['p99_ms'])
+    
+    def test_cprofile_capture(self):
+        """Test the capture window writes a cProfile file"""
+        from profiling import PhaseProfiler
+        import pstats
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'capture.prof')
+            profiler = PhaseProfiler(capture=(2, 3), capture_file=path)
+            for _ in range(5):
+                sum(range(100))
+                profiler.step()
+            self.assertTrue(os.path.exists(path))
+            pstats.Stats(path)
+
+
+class TestMetricsSink(unittest.TestCase):
+    """Test cases for the streaming metrics sink"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'run')
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_rolling_window(self):
+        """Test only the last window games are kept in memory"""
+        from metrics import MetricsSink
+        metrics = MetricsSink(window=3)
+        for score in [1, 2, 3, 4, 5]:
+            metrics.episode(score, 10)
+        self.assertEqual(list(metrics.scores), [3, 4, 5])
+        self.assertEqual(metrics.mean_score, 4)
+        self.assertEqual(metrics.record, 5)
+        self.assertEqual(metrics.games, 5)
+    
+    def test_jsonl_records(self):
+        """Test episode and interval records are streamed as JSON lines"""
+        import json
+        from metrics import MetricsSink
+        metrics = MetricsSink(self.path, interval=1e9)
+        metrics.add_steps(7)
+        metrics.episode(2, 7, loss=0.5, epsilon=80, replay_size=7)
+        metrics.close()
+        with open(self.path + '.episodes.jsonl') as f:
+            episodes = [json.loads(line) for line in f]
+        with open(self.path + '.intervals.jsonl') as f:
+            intervals = [json.loads(line) for line in f]
+        self.assertEqual(episodes[0]['score'], 2)
+        self.assertEqual(episodes[0]['loss'], 0.5)
+        self.assertEqual(intervals[-1]['steps'], 7)
+        self.assertEqual(intervals[-1]['games'], 1)
+    
+    def test_clock_checked_every_n_steps(self):
+        """Test add_steps only looks at the clock every CLOCK_EVERY steps"""
+        from metrics import MetricsSink, CLOCK_EVERY
+        metrics = MetricsSink(self.path, interval=0)
+        for _ in range(CLOCK_EVERY - 1):
+            metrics.add_steps()
+        self.assertEqual(metrics.intervals_file.size, 0)
+        metrics.add_steps()
+        self.assertGreater(metrics.intervals_file.size, 0)
+        metrics.close()
+    
+    def test_csv_rotation(self):
+        """Test full files rotate into numbered backups with a header each"""
+        import csv
+        from metrics import MetricsSink
+        metrics = MetricsSink(self.path, fmt='csv', max_bytes=200, backups=2)
+        for i in range(50):
+            metrics.episode(i, 10)
+        metrics.close()
+        name = self.path + '.episodes.csv'
+        self.assertTrue(os.path.exists(name + '.1'))
+        self.assertTrue(os.path.exists(name + '.2'))
+        self.assertFalse(os.path.exists(name + '.3'))
+        for path in (name + '.1', name):
+            self.assertLessEqual(os.path.getsize(path), 200)
+            with open(path) as f:
+                rows = list(csv.DictReader(f))
+            self.assertGreater(len(rows), 0)
+        self.assertEqual(rows[-1]['score'], '49')
+    
+    def test_prometheus_file(self):
+        """Test the Prometheus file holds the latest interval values"""
+        from metrics import MetricsSink
+        prom = os.path.join(self.tmp.name, 'snake.prom')
+        metrics = MetricsSink(prom_file=prom)
+        metrics.add_steps(5)
+        metrics.episode(3, 5, epsilon=10)
+        metrics.write_interval()
+        with open(prom) as f:
+            text = f.read()
+        self.assertIn('# TYPE snake_games_total counter', text)
+        self.assertIn('snake_score_record 3', text)
+        self.assertIn('snake_epsilon 10', text)
+        self.assertNotIn('snake_loss', text)
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Test cases for atomic, background checkpointing and resume"""
+    
+    def setUp(self):
+        """Run in a scratch directory, since agents save under ./model"""
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+    
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+    
+    def test_atomic_write_keeps_old_file(self):
+        """Test a failed write leaves the previous file and no temp file"""
+        from checkpoint import atomic_write
+        atomic_write('out.bin', lambda f: f.write(b'old'))
+        def fail(f):
+            f.write(b'half')
+            raise RuntimeError('crash')
+        with self.assertRaises(RuntimeError):
+            atomic_write('out.bin', fail)
+        with open('out.bin', 'rb') as f:
+            self.assertEqual(f.read(), b'old')
+        self.assertEqual(os.listdir('.'), ['out.bin'])
+    
+    def test_writer_reports_errors(self):
+        """Test a failed background write is raised by wait"""
+        from checkpoint import CheckpointWriter
+        writer = CheckpointWriter()
+        writer.submit('out.bin', lambda f: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            writer.wait()
+    
+    def test_save_model_snapshots_weights(self):
+        """Test save_model writes the weights as they were when called"""
+        from agent import Agent
+        agent = Agent(seed=0)
+        expected = copy.deepcopy(agent.model.state_dict())
+        agent.save_model()
+        with torch.no_grad():
+            for p in agent.model.parameters():
+                p.add_(1.0)
+        agent.writer.wait()
+        saved = torch.load('./model/model.pth')
+        for name, value in expected.items():
+            torch.testing.assert_close(saved[name], value)
+    
+    def test_resume(self):
+        """Test a checkpoint restores weights, optimizer, counters and replay"""
+        from agent import Agent
+        agent = Agent(seed=0, prioritized=True)
+        rng = np.random.default_rng(0)
+        for i in range(50):
+            state = unpack_states(rng.integers(0, 2048, 2))
+            agent.remember(state[0], int(i % 3), float(i), state[1], i % 10 == 9)
+        agent.train_long_memory()
+        agent.n_games = 7
+        agent.record = 4
+        agent.save_checkpoint(replay=True, wait=True)
+        
+        resumed = Agent(seed=1, prioritized=True)
+        self.assertTrue(resumed.load_checkpoint())
+        self.assertEqual((resumed.n_games, resumed.record), (7, 4))
+        for p, q in zip(agent.model.parameters(), resumed.model.parameters()):
+            torch.testing.assert_close(p, q)
+        torch.testing.assert_close(resumed.trainer.optimizer.state_dict()['state'][0]['exp_avg'],
+                                   agent.trainer.optimizer.state_dict()['state'][0]['exp_avg'])
+        self.assertEqual(len(resumed.memory), 50)
+        np.testing.assert_array_equal(resumed.memory.rewards[:50], agent.memory.rewards[:50])
+        self.assertAlmostEqual(resumed.memory.tree.total, agent.memory.tree.total)
+        self.assertEqual(resumed.get_action(agent.memory.states[0]),
+                         agent.get_action(agent.memory.states[0]))
+    
+    def test_interrupted_run_checkpoints(self):
+        """Test train_headless still checkpoints when the loop raises"""
+        from profiling import PhaseProfiler
+        from train import train_headless
+        class Interrupt(PhaseProfiler):
+            def step(self):
+                self.steps += 1
+                if self.steps == 50:
+                    raise KeyboardInterrupt
+        with self.assertRaises(KeyboardInterrupt):
+            train_headless(max_steps=1000, seed=0, model_file=None, log_every=1e9,
+                           profiler=Interrupt(), checkpoint_file='checkpoint.pth')
+        self.assertTrue(os.path.exists('./model/checkpoint.pth'))
+    
+    def test_replay_snapshot_order(self):
+        """Test a wrapped ring buffer restores oldest first"""
+        memory = ReplayMemory(4)
+        for i in range(6):
+            memory.append(np.zeros(11), 0, float(i), np.zeros(11), False)
+        other = ReplayMemory(4)
+        other.restore(memory.snapshot())
+        np.testing.assert_array_equal(other.snapshot()['rewards'], [2, 3, 4, 5])
+        self.assertEqual(other.position, 0)
+
+
+class TestSharedBuffers(unittest.TestCase):
+    """Test cases for the actor/learner shared-memory buffers"""
+    
+    def test_ring_wraps_in_order(self):
+        """Test drained transitions come back in push order across the wrap"""
+        ring = TransitionRing(8)
+        self.assertIsNone(ring.drain())
+        for start in (0, 5, 10):
+            n = 5
+            states = unpack_states(np.arange(start, start + n))
+            ring.push(states, np.arange(n) % 3, np.arange(start, start + n),
+                      1 - states, np.arange(n) == 0)
+            self.assertEqual(len(ring), n)
+            s, a, r, s2, d = ring.drain()
+            np.testing.assert_array_equal(s, states)
+            np.testing.assert_array_equal(s2, 1 - states)
+            np.testing.assert_array_equal(r, np.arange(start, start + n))
+            np.testing.assert_array_equal(a, np.arange(n) % 3)
+            np.testing.assert_array_equal(d, np.arange(n) == 0)
+    
+    def test_full_ring_gives_up_on_stop(self):
+        """Test a push into a full ring waits until stop is set"""
+        import multiprocessing as mp
+        ring = TransitionRing(4)
+        stop = mp.Event()
+        states = np.zeros((3, 11), dtype=np.uint8)
+        self.assertTrue(ring.push(states, np.zeros(3), np.zeros(3), states, np.zeros(3), stop))
+        stop.set()
+        self.assertFalse(ring.push(states, np.zeros(3), np.zeros(3), states, np.zeros(3), stop))
+        self.assertEqual(len(ring), 3)
+    
+    def test_weights_broadcast(self):
+        """Test an attached model follows every publish without copying"""
+        learner = Linear_QNet(11, 256, 3)
+        weights = SharedWeights(learner)
+        actor = weights.attach(Linear_QNet(11, 256, 3))
+        cache = QValueCache(actor, device=torch.device('cpu'))
+        states = torch.tensor(unpack_states(np.arange(2048)), dtype=torch.float)
+        
+        with torch.no_grad():
+            for p in learner.parameters():
+                p.add_(0.5)
+        weights.publish(learner)
+        self.assertEqual(weights.sync(cache), weights.version)
+        with torch.no_grad():
+            expected = learner(states)
+            torch.testing.assert_close(actor(states), expected)
+        np.testing.assert_array_equal(cache.actions, expected.argmax(dim=1).numpy())
+    
+    def test_short_parallel_run(self):
+        """Test one actor feeds the learner, which trains, then both shut down"""
+        import multiprocessing as mp
+        from agent import Agent
+        from parallel_train import train_parallel
+        from snake_engine import spawn_seeds
+        agent = train_parallel(num_actors=1, envs_per_actor=2, max_steps=500, max_seconds=120,
+                               sync_every=1, log_every=1e9, seed=0, model_file=None)
+        self.assertGreaterEqual(len(agent.memory), 500)
+        initial = Agent(seed=spawn_seeds(0, 2)[0])
+        changed = [not torch.equal(p, q) for p, q in
+                   zip(agent.model.parameters(), initial.model.parameters())]
+        self.assertTrue(all(changed))
+        self.assertEqual(mp.active_children(), [])
+
+
+class TestTabularAgent(unittest.TestCase):
+    """Test cases for the Q-table agent"""
+    
+    def test_update(self):
+        """Test batched updates follow the Q-learning rule"""
+        agent = TabularAgent(lr=0.5, gamma=0.9)
+        state = np.zeros(11, dtype=np.uint8)
+        next_state = unpack_states([3])[0]
+        agent.q_table[3] = [1.0, 4.0, 2.0]
+        
+        agent.train_short_memory(state, [0, 1, 0], 10.0, next_state, False)
+        self.assertAlmostEqual(float(agent.q_table[0, 1]), 0.5 * (10.0 + 0.9 * 4.0), places=5)
+        
+        # Duplicate transitions in one batch all apply
+        agent.update([state, state], [[1, 0, 0]] * 2, [-10.0, -10.0], [next_state] * 2, [True, True])
+        self.assertAlmostEqual(float(agent.q_table[0, 0]), -10.0)
+    
+    def test_greedy_action(self):
+        """Test exploitation picks the best Q-table entry"""
+        agent = TabularAgent()
+        agent.n_games = 200
+        agent.q_table[5] = [0.0, 0.0, 1.0]
+        self.assertEqual(agent.get_action(unpack_states([5])[0]), [0, 0, 1])
+    
+    def test_agent_settings(self):
+        """Test the Agent memory and short-batch settings apply to the Q-table agent"""
+        agent = TabularAgent(short_batch=4, max_memory=50, batch_size=8, seed=0)
+        self.assertEqual(agent.memory.capacity, 50)
+        state = np.zeros(11, dtype=np.uint8)
+        for _ in range(3):
+            agent.train_short_memory(state, [1, 0, 0], 10.0, state, False)
+        self.assertEqual(len(agent.short_memory), 3)
+        self.assertFalse(agent.q_table.any())
+        agent.flush_short_memory()
+        self.assertEqual(len(agent.short_memory), 0)
+        self.assertGreater(float(agent.q_table[0, 0]), 0.0)
+    
+    def test_torch_free(self):
+        """Test importing the tabular agent does not load torch"""
+        import subprocess
+        code = "import sys, tabular_agent; sys.exit('torch' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code],
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.returncode, 0)
+
+
+class TestNumpyQNet(unittest.TestCase):
+    """Test cases for the exported NumPy inference engine"""
+    
+    def test_matches_torch_model(self):
+        """Test exported weights give the same Q-values and actions"""
+        torch.manual_seed(0)
+        model = Linear_QNet(11, 256, 3)
+        states = unpack_states(np.arange(2048))
+        with torch.no_grad():
+            expected = model(torch.tensor(states, dtype=torch.float)).numpy()
+        
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'model.npz')
+            export_npz(model.state_dict(), path)
+            self.assertIsInstance(load_npz(path)['linear1.weight'], np.memmap)
+            
+            policy = NumpyQNet(path)
+            np.testing.assert_allclose(policy.forward(states), expected, rtol=1e-5, atol=1e-5)
+            np.testing.assert_array_equal(policy.predict(states), expected.argmax(axis=1))
+            del policy
+
+
+class TestQuantizedQNet(unittest.TestCase):
+    """Test cases for the int8 inference model"""
+    
+    def test_agrees_with_float_model(self):
+        """Test int8 greedy actions track the float model"""
+        torch.manual_seed(0)
+        model = Linear_QNet(11, 256, 3)
+        states = unpack_states(np.arange(2048))
+        qmodel = quantize_model(model, states[::3])
+        
+        report = quantization_report(model, qmodel)
+        self.assertEqual(report['states'], 2048)
+        self.assertGreater(report['action_agreement'], 0.95)
+        self.assertLess(report['max_q_error'], 0.1)
+        
+        # The float model is left untouched
+        self.assertTrue(all(p.dtype == torch.float for p in model.parameters()))
+    
+    def test_agent_quantize(self):
+        """Test a quantized Agent acts like its float model with a fresh cache"""
+        from agent import Agent
+        agent = Agent(seed=0)
+        agent.n_games = 100  # No random moves
+        states = unpack_states(np.arange(2048))
+        expected = np.array([agent.get_action(s) for s in states])
+        float_cache = agent.q_cache
+        
+        report = agent.quantize()
+        self.assertIsNot(agent.q_cache, float_cache)
+        self.assertIs(agent.q_cache.model, agent.quantized_model)
+        self.assertFalse(agent.q_cache.seen.any())
+        
+        # Compare on the states whose best action wins by more than the int8 error
+        q = float_cache.q_table
+        top2 = np.sort(q, axis=1)[:, -2:]
+        clear = np.flatnonzero(top2[:, 1] - top2[:, 0] > 2 * report['max_q_error'])
+        self.assertGreater(len(clear), 0)
+        actions = np.array([agent.get_action(states[i]) for i in clear])
+        np.testing.assert_array_equal(actions, expected[clear])
+
+
+if __name__ == '__main__':
+    # Run tests
+    unittest.main(verbosity=2)
@@ -4,11 +4,17 @@ Unit tests for Snake Game
 import unittest
 import sys
 import os
+import random
+import numpy as np
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from snake_game import SnakeGameAI, Direction, Point
+from snake_engine import SnakeEngine, spawn_seeds
+from vector_env import VectorSnakeEnv
+from subproc_env import SubprocSnakeEnv
+from observation import get_states
 
 
 class TestSnakeGame(unittest.TestCase):
@@ -46,9 +52,25 @@ class TestSnakeGame(unittest.TestCase):
     
     def test_collision_with_self(self):
         """Test collision detection with snake body"""
-        # Add a point to the snake that overlaps with existing body
-        self.game.snake.insert(0, self.game.snake[1])
-        self.assertTrue(self.game.is_collision(self.game.snake[0]))
+        # A point that overlaps with existing body
+        self.assertTrue(self.game.is_collision(self.game.snake[1]))
+        self.assertTrue(self.game.is_collision(self.game.snake[-1]))
+    
+    def test_collision_matches_body(self):
+        """Test the occupancy grid agrees with the body at every cell"""
+        game = SnakeGameAI(w=200, h=200, render=False)
+        random.seed(0)
+        for _ in range(300):
+            action = [0, 0, 0]
+            action[random.randint(0, 2)] = 1
+            reward, game_over, score = game.play_step(action)
+            if game_over:
+                game.reset()
+            for x in range(0, game.w, 20):
+                for y in range(0, game.h, 20):
+                    pt = Point(x, y)
+                    self.assertEqual(game.is_collision(pt),
+                                     pt != game.head and pt in game.snake)
     
     def test_movement(self):
         """Test snake movement"""
@@ -131,6 +153,22 @@ class TestGameAPI(unittest.TestCase):
             self.assertIsInstance(game_over, bool)
             self.assertIsInstance(score, int)
     
+    def test_action_formats(self):
+        """Test index, list and numpy actions turn the snake the same way"""
+        for move in range(3):
+            one_hot = [0, 0, 0]
+            one_hot[move] = 1
+            heads = []
+            for action in (move, one_hot, np.array(one_hot)):
+                game = SnakeGameAI(w=200, h=200, render=False)
+                game.play_step(action)
+                heads.append((game.head, game.direction))
+            self.assertEqual(heads[0], heads[1])
+            self.assertEqual(heads[0], heads[2])
+        
+        # Right turn from RIGHT heads DOWN, left turn heads UP
+        self.assertEqual(heads[0][1], Direction.UP)
+    
     def test_state_api(self):
         """Test state API returns correct format"""
         state = self.game.get_state()
@@ -138,6 +176,22 @@ class TestGameAPI(unittest.TestCase):
         # Should return numpy array
         self.assertEqual(state.shape, (11,))
     
+    def test_step_api(self):
+        """Test step returns the observation cached for that frame"""
+        game = SnakeGameAI(w=200, h=200, render=False)
+        obs, reward, done, info = game.step([1, 0, 0])
+        
+        self.assertEqual(obs.shape, (11,))
+        self.assertIs(game.get_state(), obs)
+        self.assertEqual(info['score'], game.score)
+        self.assertFalse(done)
+        
+        # Moving the food invalidates the cached observation
+        game.food = Point(0, 0)
+        state = game.get_state()
+        self.assertIsNot(state, obs)
+        self.assertEqual(state[7], 1)  # food left
+    
     def test_reset_api(self):
         """Test reset API"""
         # Modify game state
@@ -152,6 +206,208 @@ class TestGameAPI(unittest.TestCase):
         self.assertEqual(self.game.frame_iteration, 0)
 
 
+class TestSnakeEngine(unittest.TestCase):
+    """Test the headless simulation core"""
+    
+    def test_engine_steps_without_display(self):
+        """Test the engine plays full games with no pygame state"""
+        engine = SnakeEngine(w=200, h=200)
+        self.assertFalse(hasattr(engine, 'display'))
+        
+        games = 0
+        for _ in range(1000):
+            reward, game_over, score = engine.play_step([1, 0, 0])
+            if game_over:
+                self.assertEqual(reward, -10)
+                games += 1
+                engine.reset()
+        self.assertGreater(games, 0)
+    
+    def test_food_on_free_cell(self):
+        """Test food is never placed on the snake"""
+        engine = SnakeEngine(w=80, h=40)
+        for _ in range(200):
+            engine._place_food()
+            self.assertNotIn(engine.food, engine.snake)
+    
+    def test_seed_replays_episodes(self):
+        """Test equal seeds give identical food placement and episodes"""
+        def episode(seed):
+            engine = SnakeEngine(w=200, h=200, seed=seed)
+            trace = []
+            for i in range(500):
+                reward, game_over, score = engine.play_step(i % 7 % 3)
+                trace.append((engine.food, reward, game_over))
+                if game_over:
+                    engine.reset()
+            return trace
+        
+        self.assertEqual(episode(3), episode(3))
+        self.assertNotEqual(episode(3), episode(4))
+    
+    def test_spawn_seeds(self):
+        """Test spawned seeds are reproducible and distinct"""
+        seeds = spawn_seeds(0, 8)
+        self.assertEqual(seeds, spawn_seeds(0, 8))
+        self.assertEqual(len(set(seeds)), 8)
+        self.assertNotEqual(seeds, spawn_seeds(1, 8))
+    
+    def test_board_full_wins(self):
+        """Test eating the last free cell ends the game as a win"""
+        # 4x2 board, snake starts on the bottom row facing right
+        engine = SnakeEngine(w=80, h=40)
+        path = [([1, 0, 0], Point(60, 20)),
+                ([0, 0, 1], Point(60, 0)),
+                ([0, 0, 1], Point(40, 0)),
+                ([1, 0, 0], Point(20, 0)),
+                ([1, 0, 0], Point(0, 0))]
+        for action, food in path:
+            engine.food = food
+            reward, game_over, score = engine.play_step(action)
+            self.assertEqual(reward, 10)
+        
+        self.assertTrue(game_over)
+        self.assertTrue(engine.won)
+        self.assertEqual(len(engine.snake), 8)
+        self.assertEqual(len(engine.get_state()), 11)
+    
+    def test_headless_game(self):
+        """Test SnakeGameAI can run without rendering"""
+        game = SnakeGameAI(w=200, h=200, render=False)
+        self.assertIsNone(game.display)
+        
+        initial_head = game.head
+        reward, game_over, score = game.play_step([1, 0, 0])
+        self.assertEqual(game.head, Point(initial_head.x + 20, initial_head.y))
+        self.assertFalse(game_over)
+    
+    def test_headless_human_game(self):
+        """Test headless games never initialize pygame or pump its events"""
+        import subprocess
+        code = ("import sys, pygame, snake_game\n"
+                "game = snake_game.SnakeGameHuman(w=200, h=200, render=False)\n"
+                "game.play_step()\n"
+                "sys.exit(pygame.get_init())")
+        result = subprocess.run([sys.executable, '-c', code],
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.returncode, 0)
+    
+    def test_batched_states(self):
+        """Test batched observations match get_state bit for bit"""
+        random.seed(0)
+        games = [SnakeEngine(w=200, h=200) for _ in range(16)]
+        for _ in range(300):
+            for game in games:
+                action = [0, 0, 0]
+                action[random.randint(0, 2)] = 1
+                if game.play_step(action)[1]:
+                    game.reset()
+            states = get_states(games)
+            self.assertEqual(states.dtype, np.uint8)
+            for game, state in zip(games, states):
+                np.testing.assert_array_equal(state, game.get_state())
+
+
+class TestVectorSnakeEnv(unittest.TestCase):
+    """Test the NumPy-batched environment"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.env = VectorSnakeEnv(8, w=200, h=200, seed=0)
+    
+    def test_initialization(self):
+        """Test every game starts like SnakeEngine"""
+        engine = SnakeEngine(w=200, h=200)
+        for i in range(self.env.num_envs):
+            self.assertEqual(self.env.get_snake(i), list(engine.snake))
+        self.assertTrue((self.env.scores == 0).all())
+    
+    def test_auto_reset(self):
+        """Test games that hit the wall are reset in place"""
+        for step in range(5):
+            rewards, dones, scores = self.env.play_step(np.zeros(8, dtype=int))
+        self.assertTrue(dones.all())
+        self.assertTrue((rewards == -10).all())
+        self.assertTrue((self.env.frame_iteration == 0).all())
+        self.assertTrue((self.env.lengths == 3).all())
+    
+    def test_board_full_wins(self):
+        """Test a game that fills the board is done and reset"""
+        env = VectorSnakeEnv(2, w=80, h=40, seed=0)
+        path = [(0, 3, 1), (2, 3, 0), (2, 2, 0), (0, 1, 0), (0, 0, 0)]
+        for move, food_x, food_y in path:
+            env.food_x[:] = food_x
+            env.food_y[:] = food_y
+            rewards, dones, scores = env.play_step(np.array([move, move]))
+            self.assertTrue((rewards == 10).all())
+        
+        self.assertTrue(dones.all())
+        self.assertTrue((scores == 5).all())
+        self.assertTrue((env.lengths == 3).all())
+    
+    def test_matches_engine(self):
+        """Test lockstep games follow the same rules as SnakeEngine"""
+        engine = SnakeEngine(w=200, h=200)
+        env = VectorSnakeEnv(1, w=200, h=200, seed=0)
+        rng = np.random.default_rng(1)
+        
+        for _ in range(2000):
+            env.food_x[0] = engine.food.x // 20
+            env.food_y[0] = engine.food.y // 20
+            np.testing.assert_array_equal(env.get_state()[0], engine.get_state())
+            move = int(rng.integers(3))
+            action = [0, 0, 0]
+            action[move] = 1
+            
+            reward, done, score = engine.play_step(action)
+            rewards, dones, scores = env.play_step(np.array([move]))
+            self.assertEqual((reward, done, score), (rewards[0], dones[0], scores[0]))
+            if done:
+                engine.reset()
+            self.assertEqual(env.get_snake(0), list(engine.snake))
+
+
+class TestSubprocSnakeEnv(unittest.TestCase):
+    """Test the worker-process environment pool"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Start one pool for all tests"""
+        cls.env = SubprocSnakeEnv(2, 3, w=200, h=200)
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the workers"""
+        cls.env.close()
+    
+    def setUp(self):
+        """Start every test from fresh games"""
+        self.env.reset()
+        self.fresh = SnakeEngine(w=200, h=200).get_state()
+    
+    def test_initial_states(self):
+        """Test every game starts like SnakeEngine (food aside)"""
+        states = self.env.get_state()
+        self.assertEqual(states.shape, (6, 11))
+        for state in states:
+            np.testing.assert_array_equal(state[:7], self.fresh[:7])
+    
+    def test_async_step_and_auto_reset(self):
+        """Test games hit the wall together and are reset"""
+        # The head starts 5 cells from the right wall of a 10x10 board
+        for _ in range(4):
+            self.env.step_async([0] * 6)
+            rewards, dones, scores = self.env.step_wait()
+            self.assertFalse(dones.any())
+        np.testing.assert_array_equal(self.env.get_state()[:, 0], 1)  # danger straight
+        
+        rewards, dones, scores = self.env.play_step(np.tile([1, 0, 0], (6, 1)))
+        self.assertTrue(dones.all())
+        np.testing.assert_array_equal(rewards, -10)
+        for state in self.env.get_state():
+            np.testing.assert_array_equal(state[:7], self.fresh[:7])
+
+
 if __name__ == '__main__':
     # Run tests
     unittest.main(verbosity=2)
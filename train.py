@@ -0,0 +1,191 @@
+"""
+Headless training command
+
+Trains the DQN agent on the bare SnakeEngine: no window, no event pumping
+and no frame throttling. Nothing on this path imports pygame. Runs stop on
+whichever budget is hit first, so unattended runs have predictable lengths.
+
+Usage:
+    python train.py --max-steps 1000000 --max-seconds 3600 --target-score 20
+"""
+import argparse
+import time
+from collections import deque
+from agent import Agent, MAX_MEMORY, BATCH_SIZE, LR, SHORT_BATCH
+from metrics import MetricsSink, add_metrics_arguments
+from profiling import PhaseProfiler, add_profiler_arguments, profiler_from_args
+from snake_engine import SnakeEngine
+
+
+def train_headless(max_steps=None, max_seconds=None, target_score=None, score_window=100,
+                   max_memory=MAX_MEMORY, batch_size=BATCH_SIZE, lr=LR, gamma=0.9,
+                   short_batch=SHORT_BATCH, seed=None, model_file='model.pth', log_every=5.0,
+                   w=640, h=480, profiler=None, metrics=None, checkpoint_file=None,
+                   checkpoint_every=None, checkpoint_replay=False, resume=False,
+                   prioritized=False):
+    """
+    Train one agent on one headless game until a budget runs out
+    Args:
+        max_steps: stop after this many game steps
+        max_seconds: stop after this much wall time
+        target_score: stop once the mean of the last score_window games
+            reaches this score
+        max_memory, batch_size, lr, gamma, short_batch, seed: Agent settings
+        model_file: saved under ./model on every new record (None: never save)
+        log_every: seconds between progress lines
+        profiler: optional PhaseProfiler timing each phase of the loop
+        metrics: optional MetricsSink receiving per-game and per-interval
+            records
+        checkpoint_file: full resume state saved under ./model at the end
+            and every checkpoint_every games (None: no checkpoints)
+        checkpoint_replay: include the compressed replay memory
+        resume: continue from checkpoint_file if it exists; budgets
+            count from the start of this run
+        prioritized: sample replay by TD error instead of uniformly
+    Returns:
+        (agent, stats) where stats is a dict with 'steps', 'games',
+        'seconds', 'record', 'mean_score' and 'stopped_by'
+    """
+    if profiler is None:
+        profiler = PhaseProfiler()
+    if metrics is None:
+        metrics = MetricsSink(window=score_window)
+    agent = Agent(prioritized=prioritized, short_batch=short_batch, seed=seed,
+                  max_memory=max_memory, batch_size=batch_size, lr=lr, gamma=gamma)
+    if resume and checkpoint_file is not None:
+        if agent.load_checkpoint(checkpoint_file, replay=checkpoint_replay):
+            metrics.record = agent.record
+    start_games = agent.n_games
+    game = SnakeEngine(w, h, seed=seed)
+    recent = deque(maxlen=score_window)
+    steps = 0
+    stopped_by = None
+    start = last_log = time.time()
+
+    try:
+        while stopped_by is None:
+            with profiler.phase('get_state'):
+                state_old = agent.get_state(game)
+            with profiler.phase('get_action'):
+                final_move = agent.get_action(state_old)
+            with profiler.phase('env_step'):
+                state_new, reward, done, info = game.step(final_move)
+            with profiler.phase('train_short'):
+                agent.train_short_memory(state_old, final_move, reward, state_new, done)
+            with profiler.phase('remember'):
+                agent.remember(state_old, final_move, reward, state_new, done)
+            steps += 1
+            metrics.add_steps()
+
+            if done:
+                length = game.frame_iteration
+                with profiler.phase('env_reset'):
+                    game.reset()
+                agent.n_games += 1
+                with profiler.phase('train_long'):
+                    agent.train_long_memory()
+                score = info['score']
+                recent.append(score)
+                if score > metrics.record:
+                    agent.record = score
+                    if model_file is not None:
+                        with profiler.phase('save_model'):
+                            agent.save_model(model_file)
+                metrics.episode(score, length, loss=agent.trainer.last_loss,
+                                epsilon=agent.epsilon, replay_size=len(agent.memory))
+                if (checkpoint_file is not None and checkpoint_every and
+                        agent.n_games % checkpoint_every == 0):
+                    with profiler.phase('checkpoint'):
+                        agent.save_checkpoint(checkpoint_file, replay=checkpoint_replay)
+            profiler.step()
+
+            now = time.time()
+            if max_steps is not None and steps >= max_steps:
+                stopped_by = 'max_steps'
+            elif max_seconds is not None and now - start >= max_seconds:
+                stopped_by = 'max_seconds'
+            elif (target_score is not None and len(recent) == score_window and
+                    sum(recent) / score_window >= target_score):
+                stopped_by = 'target_score'
+
+            if now - last_log >= log_every or stopped_by is not None:
+                elapsed = max(now - start, 1e-9)
+                mean = sum(recent) / len(recent) if recent else 0.0
+                print(f"Steps {steps}, Games {agent.n_games}, Record {metrics.record}, "
+                      f"Mean({score_window}) {mean:.1f}, Steps/s {steps / elapsed:.0f}, "
+                      f"Games/s {(agent.n_games - start_games) / elapsed:.2f}")
+                last_log = now
+    finally:
+        agent.flush_short_memory()
+        if checkpoint_file is not None:
+            agent.save_checkpoint(checkpoint_file, replay=checkpoint_replay)
+        agent.writer.wait()
+        profiler.close()
+        metrics.close()
+
+    stats = {
+        'steps': steps,
+        'games': agent.n_games,
+        'seconds': time.time() - start,
+        'record': metrics.record,
+        'mean_score': sum(recent) / len(recent) if recent else 0.0,
+        'stopped_by': stopped_by,
+    }
+    return agent, stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless DQN training with run budgets')
+    parser.add_argument('--max-steps', type=int, default=None)
+    parser.add_argument('--max-seconds', type=float, default=None)
+    parser.add_argument('--target-score', type=float, default=None,
+                        help='stop when the mean score over --score-window games reaches this')
+    parser.add_argument('--score-window', type=int, default=100)
+    parser.add_argument('--max-memory', type=int, default=MAX_MEMORY)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--lr', type=float, default=LR)
+    parser.add_argument('--gamma', type=float, default=0.9)
+    parser.add_argument('--short-batch', type=int, default=SHORT_BATCH)
+    parser.add_argument('--prioritized', action='store_true',
+                        help='prioritized experience replay (sample by TD error)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--model', default='model.pth',
+                        help='file under ./model saved on each new record')
+    parser.add_argument('--no-save', action='store_true', help='never save the model')
+    parser.add_argument('--log-every', type=float, default=5.0,
+                        help='seconds between progress lines')
+    add_profiler_arguments(parser)
+    add_metrics_arguments(parser)
+    parser.add_argument('--checkpoint', default=None, metavar='FILE',
+                        help='file under ./model holding the full resume state, saved at '
+                             'the end of the run (default: no checkpoints)')
+    parser.add_argument('--checkpoint-every', type=int, default=None, metavar='GAMES',
+                        help='also checkpoint every this many games (default: only at the end)')
+    parser.add_argument('--checkpoint-replay', action='store_true',
+                        help='save and restore the replay memory with the checkpoint')
+    parser.add_argument('--resume', action='store_true', help='continue from --checkpoint')
+    args = parser.parse_args()
+    if args.max_steps is None and args.max_seconds is None and args.target_score is None:
+        parser.error('give at least one of --max-steps, --max-seconds, --target-score')
+    if args.checkpoint is None and (args.checkpoint_every or args.checkpoint_replay or
+                                    args.resume):
+        parser.error('--checkpoint-every, --checkpoint-replay and --resume need --checkpoint')
+
+    profiler = profiler_from_args(args)
+    agent, stats = train_headless(args.max_steps, args.max_seconds, args.target_score,
+                                  args.score_window, args.max_memory, args.batch_size,
+                                  args.lr, args.gamma, args.short_batch, args.seed,
+                                  None if args.no_save else args.model, args.log_every,
+                                  profiler=profiler,
+                                  metrics=MetricsSink(args.metrics, args.metrics_format,
+                                                      args.prom_file, window=args.score_window,
+                                                      interval=args.metrics_interval),
+                                  checkpoint_file=args.checkpoint,
+                                  checkpoint_every=args.checkpoint_every,
+                                  checkpoint_replay=args.checkpoint_replay, resume=args.resume,
+                                  prioritized=args.prioritized)
+    print(f"Stopped by {stats['stopped_by']} after {stats['steps']} steps, "
+          f"{stats['games']} games, {stats['seconds']:.1f}s")
+    if profiler.enabled:
+        print()
+        profiler.dump()
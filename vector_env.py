@@ -0,0 +1,160 @@
+"""
+NumPy-batched Snake environment stepping N games in lockstep
+"""
+import numpy as np
+from snake_engine import BLOCK_SIZE, Point
+from observation import DX, DY, TURN, ObservationBuilder
+
+# Stamp of a cell that has never been visited since the last reset
+EMPTY = np.iinfo(np.int32).min // 2
+
+
+class VectorSnakeEnv:
+    """
+    N independent Snake games whose state lives in NumPy arrays
+
+    The body of game i is stored as a grid of stamps: the frame at which
+    the head entered each cell. A cell is occupied while its stamp is one
+    of the last `lengths[i]` frames, so moving the snake is a single write
+    at the new head and the tail drops out on its own.
+    """
+
+    def __init__(self, num_envs, w=640, h=480, seed=None):
+        self.num_envs = num_envs
+        self.w = w
+        self.h = h
+        self.cols = w // BLOCK_SIZE
+        self.rows = h // BLOCK_SIZE
+        self.rng = np.random.default_rng(seed)
+
+        self.head_x = np.zeros(num_envs, dtype=np.int32)
+        self.head_y = np.zeros(num_envs, dtype=np.int32)
+        self.directions = np.zeros(num_envs, dtype=np.int32)
+        self.body = np.full((num_envs, self.rows, self.cols), EMPTY, dtype=np.int32)
+        self.lengths = np.zeros(num_envs, dtype=np.int32)
+        self.food_x = np.zeros(num_envs, dtype=np.int32)
+        self.food_y = np.zeros(num_envs, dtype=np.int32)
+        self.scores = np.zeros(num_envs, dtype=np.int32)
+        self.frame_iteration = np.zeros(num_envs, dtype=np.int32)
+        self._all = np.arange(num_envs)
+        self._observations = ObservationBuilder(num_envs)
+        self.reset()
+
+    def reset(self, idx=None):
+        """Reset the given games (all games by default) to initial state"""
+        if idx is None:
+            idx = self._all
+        idx = np.asarray(idx)
+        if idx.size == 0:
+            return
+
+        x = self.cols // 2
+        y = self.rows // 2
+        self.head_x[idx] = x
+        self.head_y[idx] = y
+        self.directions[idx] = 0
+        self.body[idx] = EMPTY
+        for offset in range(3):
+            self.body[idx, y, x - offset] = -offset
+        self.lengths[idx] = 3
+        self.scores[idx] = 0
+        self.frame_iteration[idx] = 0
+        self._place_food(idx)
+
+    def _occupied(self, idx):
+        """Boolean (len(idx), rows, cols) occupancy grids of the given games"""
+        return self.body[idx] > (self.frame_iteration[idx] - self.lengths[idx])[:, None, None]
+
+    def _place_food(self, idx):
+        """
+        Place food uniformly on a free cell of each given game
+        Returns:
+            (len(idx),) booleans, True for games whose board is full
+        """
+        if len(idx) == 0:
+            return np.zeros(0, dtype=bool)
+        free = ~self._occupied(idx).reshape(len(idx), -1)
+        full = ~free.any(axis=1)
+        pick = self.rng.random(free.shape)
+        pick[~free] = -1.0
+        cell = pick.argmax(axis=1)
+        # A full board keeps its food on the cell where it was eaten
+        place = idx[~full]
+        self.food_y[place] = cell[~full] // self.cols
+        self.food_x[place] = cell[~full] % self.cols
+        return full
+
+    def _action_indices(self, actions):
+        """Convert (N, 3) one-hot actions or (N,) indices to indices"""
+        actions = np.asarray(actions)
+        if actions.ndim == 2:
+            return actions.argmax(axis=1)
+        return actions
+
+    def play_step(self, actions):
+        """
+        Execute one step in every game
+        Args:
+            actions: (N, 3) one-hot [straight, right, left] actions or (N,) indices
+        Returns:
+            rewards: (N,) rewards for the actions
+            dones: (N,) booleans, True for games that ended (and were reset),
+                including games won by filling the board
+            scores: (N,) scores, the final score for games that ended
+        """
+        self.directions = (self.directions + TURN[self._action_indices(actions)]) % 4
+        new_x = self.head_x + DX[self.directions]
+        new_y = self.head_y + DY[self.directions]
+        self.frame_iteration += 1
+
+        # Collisions are checked against the body before the tail moves
+        out = (new_x < 0) | (new_x >= self.cols) | (new_y < 0) | (new_y >= self.rows)
+        cell_x = np.clip(new_x, 0, self.cols - 1)
+        cell_y = np.clip(new_y, 0, self.rows - 1)
+        stamp = self.body[self._all, cell_y, cell_x]
+        hit_self = ~out & (stamp > self.frame_iteration - 1 - self.lengths)
+        timeout = self.frame_iteration > 100 * (self.lengths + 1)
+        dones = out | hit_self | timeout
+
+        rewards = np.where(dones, -10, 0).astype(np.int32)
+        alive = ~dones
+        ate = alive & (new_x == self.food_x) & (new_y == self.food_y)
+        rewards[ate] = 10
+        self.scores[ate] += 1
+        self.lengths[ate] += 1
+
+        live = np.flatnonzero(alive)
+        self.head_x[live] = new_x[live]
+        self.head_y[live] = new_y[live]
+        self.body[live, new_y[live], new_x[live]] = self.frame_iteration[live]
+
+        # Eating the last free cell ends the game as a win
+        eaten = np.flatnonzero(ate)
+        dones[eaten[self._place_food(eaten)]] = True
+
+        scores = self.scores.copy()
+        self.reset(np.flatnonzero(dones))
+        return rewards, dones, scores
+
+    def _blocked(self, x, y):
+        """Wall or body at one cell per game, given as (N,) x and y arrays"""
+        outside = (x < 0) | (x >= self.cols) | (y < 0) | (y >= self.rows)
+        stamp = self.body[self._all, np.clip(y, 0, self.rows - 1), np.clip(x, 0, self.cols - 1)]
+        return outside | (stamp > self.frame_iteration - self.lengths)
+
+    def get_state(self):
+        """
+        Get the current state of every game for RL agents
+        Returns:
+            (N, 11) uint8 array matching SnakeEngine.get_state row by row;
+            the array is reused by the next call
+        """
+        return self._observations.build(self.head_x, self.head_y, self.directions,
+                                        self.food_x, self.food_y, self._blocked)
+
+    def get_snake(self, i):
+        """Body of game i as a list of Points, head first"""
+        occupied = self._occupied(np.array([i]))[0]
+        ys, xs = np.nonzero(occupied)
+        order = np.argsort(-self.body[i, ys, xs], kind='stable')
+        return [Point(int(xs[k]) * BLOCK_SIZE, int(ys[k]) * BLOCK_SIZE) for k in order]